@@ -0,0 +1,153 @@
+'''
+Performance benchmarks of the app, run them with `python runbenchmarks.py`.
+
+A benchmark is a generator registered through `benchmark`, yielding one dict
+of results per case measured: the parameters of the case along with the
+metrics measured (`seconds`, `queries`...). Each benchmark runs in a
+transaction which is rolled back afterwards, as tests do.
+
+Results can be saved as JSON and compared with the ones of another run, e.g.
+of a previous commit.
+'''
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+from importlib import import_module
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+MODULES = [
+    'benchmarks.serializers',
+    'benchmarks.models',
+    'benchmarks.api',
+]
+
+METRICS = ['seconds', 'queries', 'speedup']
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    name = '{}.{}'.format(func.__module__.rsplit('.', 1)[-1], func.__name__)
+    BENCHMARKS[name] = func
+    return func
+
+
+def measure(func, repeat=5, number=1):
+    '''
+    Returns the best time in seconds taken by a call to func out of `repeat`
+    runs of `number` calls each.
+    '''
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        for j in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def count_queries(func):
+    '''
+    Returns the number of queries run by a call to func.
+    '''
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return len(queries)
+
+
+def run(names=None, stdout=print):
+    '''
+    Runs the benchmarks whose name starts with any of the names given (all of
+    them by default) and returns their results.
+    '''
+    for module in MODULES:
+        import_module(module)
+
+    # The same data at each run
+    random.seed(0)
+    results = []
+
+    for name, func in BENCHMARKS.items():
+        if names and not any(name.startswith(n) for n in names):
+            continue
+
+        stdout(name)
+        with transaction.atomic():
+            for result in func():
+                result = {'benchmark': name, **result}
+                stdout('\t' + ', '.join(
+                    f'{k}={v:.6f}' if isinstance(v, float) else f'{k}={v}'
+                    for k, v in result.items() if k != 'benchmark'
+                ))
+                results.append(result)
+            transaction.set_rollback(True)
+
+    return results
+
+
+def get_case(result):
+    return tuple(sorted(
+        (k, v) for k, v in result.items() if k not in METRICS
+    ))
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump({
+            'commit': get_commit(),
+            'date': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'results': results,
+        }, f, indent=2)
+
+
+def compare(path, results, stdout=print, threshold=1.1):
+    '''
+    Prints how the results compare with the ones saved at the path given,
+    flagging the cases at least `threshold` times slower or running more
+    queries. Returns the number of such regressions.
+    '''
+    with open(path) as f:
+        previous = json.load(f)
+    previous_results = {get_case(r): r for r in previous['results']}
+
+    stdout(f'Compared with {previous["commit"]} ({previous["date"]})')
+    regressions = 0
+
+    for result in results:
+        before = previous_results.get(get_case(result))
+        if before is None:
+            continue
+
+        ratio = result['seconds'] / before['seconds']
+        regression = ratio >= threshold or (
+            result.get('queries', 0) > before.get('queries', 0)
+        )
+        regressions += regression
+
+        stdout('{}{}: {:.2f}x{}'.format(
+            '! ' if regression else '  ',
+            ', '.join(f'{k}={v}' for k, v in get_case(result)),
+            ratio,
+            ' ({} -> {} queries)'.format(
+                before.get('queries'), result.get('queries')
+            ) if 'queries' in result else '',
+        ))
+
+    return regressions
@@ -0,0 +1,128 @@
+import json
+from urllib.parse import parse_qsl, urlsplit
+
+from django.core.cache import cache
+from django.test import Client
+from rest_framework.reverse import reverse
+
+from rhodonea_mapper.api.serializers import LayerDetailSerializer
+from rhodonea_mapper.generator import generate
+
+from benchmarks import benchmark, count_queries, measure
+from benchmarks.data import create_layer, get_rhodoneas_data
+
+
+SIZES = [10, 100, 1000]
+
+
+@benchmark
+def layer_create():
+    client = Client()
+
+    for size in SIZES:
+        data = {
+            'title': f'Layer of {size} rhodoneas',
+            'rhodoneas': get_rhodoneas_data(size, nodes_count=100),
+        }
+
+        def create():
+            serializer = LayerDetailSerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+        yield {
+            'rhodoneas': size,
+            'seconds': measure(create),
+            'queries': count_queries(create),
+        }
+
+        def post():
+            response = client.post(
+                reverse('layer-list'),
+                data=json.dumps(data),
+                content_type='application/json',
+            )
+            assert response.status_code == 201, response.content
+
+        yield {
+            'rhodoneas': size,
+            'request': True,
+            'seconds': measure(post),
+            'queries': count_queries(post),
+        }
+
+
+def get_last_cursor_params(client, url):
+    '''
+    Returns the query parameters of the last page of the layers paginated by
+    cursor, reached following the next links from the first one.
+    '''
+    params = {'pagination': 'cursor'}
+    while True:
+        response = client.get(url, data=params)
+        assert response.status_code == 200, response.content
+        next_url = response.json()['next']
+        if not next_url:
+            return params
+        params = dict(parse_qsl(urlsplit(next_url).query))
+
+
+@benchmark
+def layers_list():
+    client = Client()
+    layers_count = 0
+
+    for size in [100, 1000, 10000]:
+        generate(
+            size - layers_count,
+            nodes_range=(10, 100),
+            seed=size,
+            processes=1,
+        )
+        layers_count = size
+
+        # The last page of 10 layers either way
+        url = reverse('layer-list')
+        for pagination, params in [
+            ('offset', {'offset': size - 10}),
+            ('cursor', get_last_cursor_params(client, url)),
+        ]:
+            def get():
+                response = client.get(url, data=params)
+                assert response.status_code == 200, response.content
+
+            yield {
+                'layers': size,
+                'pagination': pagination,
+                'seconds': measure(get),
+                'queries': count_queries(get),
+            }
+
+
+@benchmark
+def layer_detail():
+    client = Client()
+
+    for size in SIZES:
+        url = reverse('layer-detail', args=[create_layer(size).pk])
+
+        def get():
+            response = client.get(url)
+            assert response.status_code == 200, response.content
+
+        def get_uncached():
+            cache.clear()
+            get()
+
+        yield {
+            'rhodoneas': size,
+            'cached': False,
+            'seconds': measure(get_uncached),
+            'queries': count_queries(get_uncached),
+        }
+        yield {
+            'rhodoneas': size,
+            'cached': True,
+            'seconds': measure(get),
+            'queries': count_queries(get),
+        }
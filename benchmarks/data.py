@@ -0,0 +1,42 @@
+import random
+
+from django.contrib.gis.geos import GEOSGeometry
+
+from rhodonea_mapper.models import Layer
+
+
+def get_rhodoneas_data(rhodoneas_count, nodes_count=1000):
+    '''
+    Returns the data, as sent to the API, of random rhodoneas scattered
+    around a random point.
+    '''
+    lng, lat = random.uniform(-170, 170), random.uniform(-70, 70)
+
+    return [
+        {
+            'name': f'Rhodonea {i}',
+            'point': 'SRID=4326;POINT ({} {})'.format(
+                lng + random.uniform(-0.1, 0.1),
+                lat + random.uniform(-0.1, 0.1),
+            ),
+            'r': random.randint(1000, 5000),
+            'n': random.randint(1, 10),
+            'd': random.randint(1, 10),
+            'rotation': random.randint(0, 359),
+            'nodes_count': nodes_count,
+        }
+        for i in range(rhodoneas_count)
+    ]
+
+
+def create_layer(rhodoneas_count, nodes_count=1000):
+    '''
+    Creates a layer of random rhodoneas scattered around a random point.
+    '''
+    rhodoneas_data = get_rhodoneas_data(rhodoneas_count, nodes_count)
+    for data in rhodoneas_data:
+        data['point'] = GEOSGeometry(data['point'])
+
+    return Layer.objects.create_with_rhodoneas(
+        rhodoneas_data, title=f'Layer of {rhodoneas_count} rhodoneas'
+    )
@@ -0,0 +1,43 @@
+from django.contrib.gis.geos import Point
+
+from rhodonea_mapper.geometry import build_curves
+from rhodonea_mapper.models import Layer, Rhodonea
+
+from benchmarks import benchmark, count_queries, measure
+from benchmarks.data import create_layer
+
+
+SIZES = [10, 100, 1000]
+
+
+@benchmark
+def build_envelope():
+    rhodonea = Rhodonea(point=Point(10, 45, srid=4326), r=2500)
+    yield {
+        'seconds': measure(rhodonea.build_envelope, number=100),
+    }
+
+
+@benchmark
+def set_envelope():
+    for size in SIZES:
+        layer = Layer.objects.get(pk=create_layer(size, nodes_count=100).pk)
+        yield {
+            'rhodoneas': size,
+            'seconds': measure(layer.set_envelope),
+            'queries': count_queries(layer.set_envelope),
+        }
+
+
+@benchmark
+def curves():
+    for nodes_count in [100, 1000]:
+        for size in SIZES:
+            rhodoneas = list(
+                create_layer(size, nodes_count=nodes_count).rhodoneas.all()
+            )
+            yield {
+                'rhodoneas': size,
+                'nodes_count': nodes_count,
+                'seconds': measure(lambda: build_curves(rhodoneas)),
+            }
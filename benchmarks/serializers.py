@@ -0,0 +1,36 @@
+from rhodonea_mapper.api.serializers import (
+    LayerDetailReadSerializer,
+    LayerDetailSerializer,
+)
+from rhodonea_mapper.models import Layer
+
+from benchmarks import benchmark, measure
+from benchmarks.data import create_layer
+
+
+SIZES = [10, 100, 500]
+
+
+@benchmark
+def layer_detail():
+    for size in SIZES:
+        pk = create_layer(size).pk
+
+        baseline = measure(
+            lambda: LayerDetailSerializer(Layer.objects.get(pk=pk)).data
+        )
+        yield {
+            'serializer': 'LayerDetailSerializer',
+            'rhodoneas': size,
+            'seconds': baseline,
+        }
+
+        fast = measure(
+            lambda: LayerDetailReadSerializer(Layer.objects.get(pk=pk)).data
+        )
+        yield {
+            'serializer': 'LayerDetailReadSerializer',
+            'rhodoneas': size,
+            'seconds': fast,
+            'speedup': baseline / fast,
+        }
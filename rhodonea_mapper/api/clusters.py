@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.db import connection
+from django.http import Http404
+from django.utils.cache import patch_cache_control
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from rhodonea_mapper.api.tiles import MERCATOR_MAX_LATITUDE
+from rhodonea_mapper.cache import get_cache
+from rhodonea_mapper.geometry import MAX_ZOOM, tile_bounds, zoom_resolution
+from rhodonea_mapper.models import Layer
+
+
+# Side in pixels of the cells the layers are clustered in, a tile of 256
+# pixels holds 4 x 4 cells.
+CLUSTER_CELL_SIZE = 64
+
+CLUSTERS_SQL = '''
+WITH
+bounds AS (
+    SELECT ST_Transform(
+        ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 3857), 4326
+    ) AS area
+),
+layers AS (
+    SELECT
+        l.envelope,
+        ST_Transform(
+            ST_Centroid(ST_ClipByBox2D(l.envelope, {world})), 3857
+        ) AS centre
+    FROM {layer_table} l, bounds
+    WHERE l.envelope && bounds.area
+),
+cells AS (
+    -- Column and row of the cell, counted from the corner of the tile
+    SELECT
+        envelope,
+        centre,
+        floor((ST_X(centre) - %(xmin)s) / %(cell_size)s) AS cell_x,
+        floor((ST_Y(centre) - %(ymin)s) / %(cell_size)s) AS cell_y
+    FROM layers
+    -- Each layer belongs to the one tile its centre falls in
+    WHERE
+        ST_X(centre) >= %(xmin)s AND ST_X(centre) < %(xmax)s AND
+        ST_Y(centre) >= %(ymin)s AND ST_Y(centre) < %(ymax)s
+)
+SELECT
+    COUNT(*),
+    ST_X(ST_Transform(ST_Centroid(ST_Collect(centre)), 4326)),
+    ST_Y(ST_Transform(ST_Centroid(ST_Collect(centre)), 4326)),
+    MIN(ST_XMin(envelope)),
+    MIN(ST_YMin(envelope)),
+    MAX(ST_XMax(envelope)),
+    MAX(ST_YMax(envelope))
+FROM cells
+GROUP BY cell_x, cell_y
+ORDER BY 1 DESC, 2, 3
+'''.format(
+    world='ST_MakeEnvelope(-180, {0}, 180, {1}, 4326)'.format(
+        -MERCATOR_MAX_LATITUDE, MERCATOR_MAX_LATITUDE
+    ),
+    layer_table=Layer._meta.db_table,
+)
+
+
+def build_clusters(z, x, y):
+    '''
+    Returns the GeoJSON FeatureCollection of the clusters of the layers whose
+    centre falls in the tile given: one Point feature per cell of the grid
+    laid on the tile, placed at the centroid of the centres of its layers and
+    carrying their number and their overall extent.
+    '''
+    xmin, ymin, xmax, ymax = tile_bounds(z, x, y)
+    params = {
+        'xmin': xmin,
+        'ymin': ymin,
+        'xmax': xmax,
+        'ymax': ymax,
+        'cell_size': zoom_resolution(z) * CLUSTER_CELL_SIZE,
+    }
+
+    with connection.cursor() as cursor:
+        cursor.execute(CLUSTERS_SQL, params)
+        rows = cursor.fetchall()
+
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [lng, lat]},
+                'bbox': list(extent),
+                'properties': {'count': count},
+            }
+            for count, lng, lat, *extent in rows
+        ],
+    }
+
+
+class ClustersView(APIView):
+    '''
+    Serves the layers clustered on a grid whose cells shrink as the zoom level
+    increases, one tile at a time so that each response can be cached.
+    '''
+    def get(self, request, z, x, y):
+        if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            raise Http404
+
+        max_age = getattr(settings, 'RHODONEA_MAPPER_TILES_MAX_AGE', 300)
+        data = get_cache().get_or_set(
+            f'rhodonea_mapper:clusters:{z}:{x}:{y}',
+            lambda: build_clusters(z, x, y),
+            max_age,
+        )
+
+        response = Response(data)
+        patch_cache_control(response, public=True, max_age=max_age)
+        return response
@@ -0,0 +1,22 @@
+from django.http import StreamingHttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from rhodonea_mapper.export import EXPORT_FORMATS, iter_export
+
+
+class ExportView(APIView):
+    '''
+    Streams all the layers along with their rhodoneas, either as a GeoJSON
+    FeatureCollection or as newline delimited GeoJSON features.
+    '''
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, output):
+        response = StreamingHttpResponse(
+            iter_export(output), content_type=EXPORT_FORMATS[output][1]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="rhodonea_mapper.{output}"'
+        )
+        return response
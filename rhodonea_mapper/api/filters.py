@@ -0,0 +1,51 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery
+from django.db.models import BooleanField, Func, Q, Value
+from rest_framework.filters import SearchFilter
+
+
+class TrigramSimilar(Func):
+    '''
+    Whether the similarity of the two strings given is above the threshold of
+    pg_trgm (`%` operator), answered by trigram indexes.
+    '''
+    arg_joiner = ' %% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def build_prefix_query(terms):
+    '''
+    Returns the text search query matching the documents holding every word
+    of the terms given as a prefix, None if there are no words.
+    '''
+    words = [word for term in terms for word in re.findall(r'\w+', term)]
+    if not words:
+        return None
+    return SearchQuery(
+        ' & '.join(f'{word}:*' for word in words),
+        config='simple',
+        search_type='raw',
+    )
+
+
+class LayerSearchFilter(SearchFilter):
+    '''
+    Full-text search over the titles and the notes of the layers and the
+    names of their rhodoneas, every word being matched as a prefix. Layers
+    whose title is similar to the search are returned as well, to forgive
+    typos. Both are answered by GIN indexes and combine with the other
+    filters and the ordering of the layers.
+    '''
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        condition = Q(TrigramSimilar('title', Value(' '.join(terms))))
+        query = build_prefix_query(terms)
+        if query is not None:
+            condition |= Q(search_vector=query)
+
+        return queryset.filter(condition)
@@ -1,15 +1,31 @@
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
 from rest_framework.mixins import (
     CreateModelMixin,
     RetrieveModelMixin,
     ListModelMixin,
 )
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.pagination import (
+    CursorPagination,
+    LimitOffsetPagination,
+)
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.viewsets import GenericViewSet
 
+from rhodonea_mapper.api.filters import LayerSearchFilter
+from rhodonea_mapper.api.renderers import ColumnarRenderer
 from rhodonea_mapper.api.serializers import (
     LayerSerializer,
     LayerDetailSerializer,
+    LayerDetailReadSerializer,
 )
+from rhodonea_mapper.cache import get_layer_payload, get_layers_payloads
+from rhodonea_mapper.counters import overlays_counter
+from rhodonea_mapper.geometry import MAX_ZOOM, zoom_tolerance
 from rhodonea_mapper.models import Layer
 
 
@@ -18,22 +34,252 @@ class LayersPagination(LimitOffsetPagination):
     max_limit = 50
 
 
+class LayersCursorPagination(CursorPagination):
+    '''
+    Keyset pagination: a page is fetched seeking past the last (created, id)
+    of the previous one, hence page N costs as much as the first one does.
+    '''
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 50
+    ordering = ['-created', '-id']
+
+    def decode_cursor(self, request):
+        # An empty cursor stands for the first page
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+
 class LayersViewSet(
     CreateModelMixin, RetrieveModelMixin, ListModelMixin, GenericViewSet
 ):
     queryset = Layer.objects.all()
     pagination_class = LayersPagination
-    ordering = ['-created']
+    cursor_pagination_class = LayersCursorPagination
+    ordering = ['-created', '-id']
+    batch_max_size = 50
+    curve_formats = ['geojson', 'polyline']
+    max_polyline_precision = 6
+    # The indexed search of the layers stands in for the default one
+    filter_backends = [
+        LayerSearchFilter if backend is SearchFilter else backend
+        for backend in api_settings.DEFAULT_FILTER_BACKENDS
+    ]
 
     bbox_filter_field = 'envelope'
     bbox_filter_include_overlapping = True
 
+    @property
+    def paginator(self):
+        '''
+        The layers are paginated by offset unless `pagination=cursor` is
+        requested, the links to the other pages carry the parameter along.
+        '''
+        if not hasattr(self, '_paginator'):
+            params = getattr(self.request, 'query_params', {})
+            if params.get('pagination') == 'cursor' or params.get('cursor'):
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        # The details of the layers can be sent in a compact binary format
+        if self.action in ['retrieve', 'batch']:
+            renderers.append(ColumnarRenderer())
+        return renderers
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Notes are only shown in the details
+            return queryset.only(*LayerSerializer.Meta.fields)
+        return queryset
+
     def get_serializer_class(self):
         if self.action == 'list':
             return LayerSerializer
+        if self.action in ['retrieve', 'batch']:
+            return LayerDetailReadSerializer
         return LayerDetailSerializer
 
+    def get_curve_tolerance(self):
+        '''
+        Returns the tolerance (in degrees) the curves have to be simplified by
+        as requested either directly through `tolerance` or through the `zoom`
+        level the curves are going to be shown at.
+        '''
+        params = self.request.query_params
+
+        if 'tolerance' in params:
+            try:
+                tolerance = float(params['tolerance'])
+            except ValueError:
+                tolerance = -1
+            if not 0 <= tolerance < 360:
+                raise ValidationError({
+                    'tolerance': 'Ensure this is a number between 0 and 360.'
+                })
+            return tolerance
+
+        if 'zoom' in params:
+            try:
+                zoom = int(params['zoom'])
+            except ValueError:
+                zoom = -1
+            if not 0 <= zoom <= MAX_ZOOM:
+                raise ValidationError({'zoom': (
+                    f'Ensure this is an integer between 0 and {MAX_ZOOM}.'
+                )})
+            return zoom_tolerance(zoom)
+
+        return None
+
+    def get_polyline_precision(self):
+        '''
+        Returns the precision (decimal digits) of the curves to be sent as
+        Google encoded polylines, as requested through `curve_format` and
+        `precision`, None if they have to be sent as GeoJSON.
+        '''
+        params = self.request.query_params
+
+        curve_format = params.get('curve_format', 'geojson')
+        if curve_format not in self.curve_formats:
+            raise ValidationError({'curve_format': (
+                'Ensure this is one of: {}.'.format(
+                    ', '.join(self.curve_formats)
+                )
+            )})
+
+        # The columnar format has curves of its own, the precision is only
+        # validated when it is used
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if curve_format != 'polyline' or isinstance(
+            renderer, ColumnarRenderer
+        ):
+            return None
+
+        try:
+            precision = int(params.get('precision', 5))
+        except ValueError:
+            precision = -1
+        if not 1 <= precision <= self.max_polyline_precision:
+            raise ValidationError({'precision': (
+                'Ensure this is an integer between 1 and '
+                f'{self.max_polyline_precision}.'
+            )})
+        return precision
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['tolerance'] = self.get_curve_tolerance()
+        if self.action in ['retrieve', 'batch']:
+            context['polyline_precision'] = self.get_polyline_precision()
+        return context
+
+    def add_overlays(self, layers):
+        '''
+        Counts an overlay for each of the layers given, returns their
+        overlays counts including it and the ones not flushed yet.
+        '''
+        pending = overlays_counter.pending()
+        overlays_counter.add(*[layer.pk for layer in layers])
+        return {
+            layer.pk: layer.overlays_count + pending.get(layer.pk, 0) + 1
+            for layer in layers
+        }
+
+    def get_cacheable_data(self, data):
+        '''
+        Returns the representation of a layer without its overlays count,
+        which changes without `modified` being touched: it is left out of the
+        cache and of the ETag, and filled in when responding.
+        '''
+        return {**data, 'overlays_count': None}
+
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.add_overlay()
-        return super().retrieve(request, *args, **kwargs)
+        overlays_counts = self.add_overlays([instance])
+
+        # Rhodoneas are only fetched when the layer is not cached
+        etag, data = get_layer_payload(
+            instance,
+            lambda: self.get_cacheable_data(
+                self.get_serializer(instance).data
+            ),
+            'detail',
+            self.get_curve_tolerance(),
+            self.get_polyline_precision(),
+        )
+        last_modified = int(instance.modified.timestamp())
+
+        # Every format has its own representation
+        renderer_format = request.accepted_renderer.format
+        if renderer_format != 'json':
+            etag = '"{}-{}"'.format(etag.strip('"'), renderer_format)
+        # Weak: the overlays count may differ between equivalent responses
+        etag = 'W/' + etag
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = Response({
+                **data, 'overlays_count': overlays_counts[instance.pk]
+            })
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    def get_batch_ids(self):
+        '''
+        Returns the distinct ids of the layers requested through `ids`, a
+        comma separated list.
+        '''
+        try:
+            ids = list(dict.fromkeys(
+                int(i) for i in self.request.query_params.get(
+                    'ids', ''
+                ).split(',') if i.strip()
+            ))
+        except ValueError:
+            ids = []
+        if not 0 < len(ids) <= self.batch_max_size:
+            raise ValidationError({'ids': (
+                'Ensure this is a comma separated list of at most '
+                f'{self.batch_max_size} layer ids.'
+            )})
+        return ids
+
+    @action(detail=False)
+    def batch(self, request, *args, **kwargs):
+        '''
+        Returns the details of many layers at once, in the order requested,
+        the layers not found being left out. The layers are fetched, counted
+        as overlaid and represented (the ones not cached yet) with a fixed
+        number of queries.
+        '''
+        ids = self.get_batch_ids()
+        layers = self.get_queryset().in_bulk(ids)
+        layers = [layers[pk] for pk in ids if pk in layers]
+        overlays_counts = self.add_overlays(layers) if layers else {}
+
+        payloads = get_layers_payloads(
+            layers,
+            lambda missing: [
+                self.get_cacheable_data(data)
+                for data in self.get_serializer(missing, many=True).data
+            ],
+            'detail',
+            self.get_curve_tolerance(),
+            self.get_polyline_precision(),
+        )
+        response = Response({'results': [
+            {**data, 'overlays_count': overlays_counts[layer.pk]}
+            for layer, (etag, data) in zip(layers, payloads)
+        ]})
+        patch_vary_headers(response, ['Accept'])
+        return response
@@ -0,0 +1,17 @@
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from rhodonea_mapper.instrumentation import metrics
+
+
+class MetricsView(APIView):
+    '''
+    Serves the metrics of the requests instrumented by this process in the
+    Prometheus text format.
+    '''
+    permission_classes = [IsAdminUser]
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type=self.content_type)
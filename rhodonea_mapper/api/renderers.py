@@ -0,0 +1,198 @@
+'''
+Compact binary representation of the details of layers.
+
+The numeric fields of the rhodoneas are sent as columns of little-endian
+typed values, the curves as int32 coordinates (1e-7 degrees) delta encoded
+curve by curve. The payload is laid out so that every column can be viewed
+by a typed array without being copied:
+
+    magic        4 bytes, b'RHMC'
+    version      uint32
+    header size  uint32, bytes of the header
+    padding      4 bytes
+    header       UTF-8 JSON, padded with spaces to a multiple of 8 bytes
+    columns      one after the other, each one padded to a multiple of 8
+
+The header holds the layers (their fields but the rhodoneas, plus
+`rhodoneas_count`), the other fields of the rhodoneas as lists (`fields`)
+and the directory of the columns (`columns`): name, type of typed array,
+offset in bytes from the end of the header and number of items. The
+longitudes of a curve are decoded by continuity, hence may exceed 180
+degrees in absolute value when the curve crosses the antimeridian.
+'''
+import json
+import struct
+
+import numpy as np
+from django.contrib.gis.geos import GEOSGeometry
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+MAGIC = b'RHMC'
+VERSION = 1
+PREAMBLE = struct.Struct('<4sII4x')
+
+CURVE_SCALE = 10 ** 7
+
+TYPES = {'Float64Array': '<f8', 'Int32Array': '<i4', 'Uint32Array': '<u4'}
+
+# Name, field of the representation, typed array type
+COLUMNS = [
+    ('lng', None, 'Float64Array'),
+    ('lat', None, 'Float64Array'),
+    ('r', 'r', 'Float64Array'),
+    ('rotation', 'rotation', 'Float64Array'),
+    ('n', 'n', 'Int32Array'),
+    ('d', 'd', 'Int32Array'),
+    ('nodes_count', 'nodes_count', 'Int32Array'),
+    ('stroke_weight', 'stroke_weight', 'Int32Array'),
+]
+
+COLUMNS_FIELDS = {'point', 'curve'} | {
+    field for name, field, array_type in COLUMNS if field
+}
+
+
+def get_point_coords(point):
+    # GeoJSON unless rest_framework_gis is not installed
+    if isinstance(point, dict):
+        return point['coordinates'][:2]
+    return GEOSGeometry(point).coords[:2]
+
+
+def encode_curves(curves):
+    '''
+    Returns the number of points of each curve (0 when missing) and the
+    flat array of their coordinates as int32 deltas, the first point of
+    every curve being absolute.
+    '''
+    coords = [
+        np.asarray(curve['coordinates'], dtype=float).reshape(-1, 2)
+        if curve else np.empty((0, 2))
+        for curve in curves
+    ]
+    sizes = np.array([len(c) for c in coords], dtype='<u4')
+    if not sizes.sum():
+        return sizes, np.empty(0, dtype='<i4')
+
+    points = np.rint(np.concatenate(coords) * CURVE_SCALE).astype(np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), np.int64))
+    # Crossing the antimeridian is a short step, not a whole turn
+    turn = 360 * CURVE_SCALE
+    deltas[:, 0] = (deltas[:, 0] + turn // 2) % turn - turn // 2
+
+    starts = np.cumsum(sizes) - sizes
+    starts = starts[sizes > 0]
+    deltas[starts] = points[starts]
+
+    return sizes, deltas.astype('<i4').ravel()
+
+
+def pad(data, fill=b'\0'):
+    return data + fill * (-len(data) % 8)
+
+
+def encode_layers(layers):
+    '''
+    Returns the binary payload representing the layers given (as
+    represented by LayerDetailReadSerializer).
+    '''
+    rhodoneas = [rh for layer in layers for rh in layer['rhodoneas']]
+
+    points = np.array(
+        [get_point_coords(rh['point']) for rh in rhodoneas], dtype=float
+    ).reshape(-1, 2)
+    arrays = []
+    for name, field, array_type in COLUMNS:
+        if field is None:
+            values = points[:, 0 if name == 'lng' else 1]
+        else:
+            values = [float(rh[field]) for rh in rhodoneas]
+        arrays.append(
+            (name, array_type, np.asarray(values, dtype=TYPES[array_type]))
+        )
+
+    sizes, deltas = encode_curves([rh.get('curve') for rh in rhodoneas])
+    arrays.append(('curve_sizes', 'Uint32Array', sizes))
+    arrays.append(('curves', 'Int32Array', deltas))
+
+    header = {
+        'layers': [
+            {
+                **{k: v for k, v in layer.items() if k != 'rhodoneas'},
+                'rhodoneas_count': len(layer['rhodoneas']),
+            }
+            for layer in layers
+        ],
+        'fields': {
+            field: [rh[field] for rh in rhodoneas]
+            for field in (rhodoneas[0] if rhodoneas else {})
+            if field not in COLUMNS_FIELDS
+        },
+        'columns': [],
+    }
+
+    columns = []
+    offset = 0
+    for name, array_type, array in arrays:
+        header['columns'].append({
+            'name': name,
+            'type': array_type,
+            'offset': offset,
+            'length': len(array),
+        })
+        columns.append(pad(array.tobytes()))
+        offset += len(columns[-1])
+
+    encoded_header = pad(
+        json.dumps(header, cls=JSONEncoder).encode(), fill=b' '
+    )
+    return b''.join([
+        PREAMBLE.pack(MAGIC, VERSION, len(encoded_header)),
+        encoded_header,
+        *columns,
+    ])
+
+
+def decode_layers(payload):
+    '''
+    Returns the header and the columns, as NumPy arrays viewing the payload,
+    of a payload encoded by `encode_layers`.
+    '''
+    magic, version, header_size = PREAMBLE.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not a columnar payload of a supported version.')
+
+    start = PREAMBLE.size + header_size
+    header = json.loads(bytes(payload[PREAMBLE.size:start]))
+    columns = {
+        column['name']: np.frombuffer(
+            payload,
+            dtype=TYPES[column['type']],
+            count=column['length'],
+            offset=start + column['offset'],
+        )
+        for column in header['columns']
+    }
+    return header, columns
+
+
+class ColumnarRenderer(BaseRenderer):
+    '''
+    Renders the details of a layer, or the results of a batch of them, in
+    the columnar binary format. Errors are rendered as JSON.
+    '''
+    media_type = 'application/vnd.rhodonea-mapper.columnar'
+    format = 'columnar'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None and response.status_code >= 400:
+            response['Content-Type'] = JSONRenderer.media_type
+            return JSONRenderer().render(data)
+
+        layers = data['results'] if 'results' in data else [data]
+        return encode_layers(layers)
@@ -1,11 +1,37 @@
+from collections import defaultdict
+from types import SimpleNamespace
+
 from django.contrib.gis.geos import GEOSGeometry
 from rest_framework.exceptions import ValidationError
-from rest_framework.serializers import ModelSerializer
-
+from rest_framework.fields import SkipField
+from rest_framework.serializers import (
+    BaseSerializer,
+    ListSerializer,
+    ModelSerializer,
+)
+from rest_framework_gis.fields import GeometryField
+
+from rhodonea_mapper.cache import get_cached_many, get_rhodonea_cache_key
+from rhodonea_mapper.geometry import encode_polylines, linestring_coords
+from rhodonea_mapper.instrumentation import instrumented
 from rhodonea_mapper.models import Layer, Rhodonea
 
 
+class CurveField(GeometryField):
+    '''
+    GeoJSON field simplifying the curve (Douglas-Peucker) by the `tolerance`
+    found in the serializer context, if any.
+    '''
+    def to_representation(self, value):
+        tolerance = self.context.get('tolerance')
+        if value is not None and tolerance:
+            value = value.simplify(tolerance)
+        return super().to_representation(value)
+
+
 class RhodoneaDetailSerializer(ModelSerializer):
+    curve = CurveField(read_only=True)
+
     def validate_point(self, point_wkt):
         try:
             GEOSGeometry(point_wkt)
@@ -14,6 +40,18 @@ class RhodoneaDetailSerializer(ModelSerializer):
 
         return point_wkt
 
+    def validate_d(self, d):
+        if d == 0:
+            raise ValidationError('This value cannot be zero.')
+
+        return d
+
+    def validate_nodes_count(self, nodes_count):
+        if nodes_count < 1:
+            raise ValidationError('Ensure this value is greater than 0.')
+
+        return nodes_count
+
     class Meta:
         model = Rhodonea
         fields = [
@@ -29,14 +67,20 @@ class RhodoneaDetailSerializer(ModelSerializer):
             'nodes_count',
             'stroke_color',
             'stroke_weight',
+            'curve',
         ]
         read_only_fields = [
             'id',
             'created',
+            'curve',
         ]
 
 
 class LayerSerializer(ModelSerializer):
+    @instrumented('serialization')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
     class Meta:
         model = Layer
         fields = [
@@ -60,14 +104,15 @@ class LayerDetailSerializer(ModelSerializer):
 
         return rhodoneas
 
+    @instrumented('serialization')
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
     def create(self, validated_data):
         rhodoneas_data = validated_data.pop('rhodoneas')
-        layer = Layer.objects.create(**validated_data)
-
-        for rh_data in rhodoneas_data:
-            Rhodonea.objects.create(layer=layer, **rh_data)
-
-        return layer
+        return Layer.objects.create_with_rhodoneas(
+            rhodoneas_data, **validated_data
+        )
 
     class Meta:
         model = Layer
@@ -86,3 +131,119 @@ class LayerDetailSerializer(ModelSerializer):
             'envelope',
             'overlays_count',
         ]
+
+
+def represent(fields, obj):
+    '''
+    Returns a plain dict representing obj through the fields given, the same
+    way `Serializer.to_representation` does.
+    '''
+    data = {}
+    for field in fields:
+        try:
+            attribute = field.get_attribute(obj)
+        except SkipField:
+            continue
+        data[field.field_name] = (
+            None if attribute is None else field.to_representation(attribute)
+        )
+    return data
+
+
+def get_polylines(rows, precision, tolerance=None):
+    '''
+    Returns the encoded polylines of the curves (simplified by the tolerance
+    given) of the rhodonea rows, None when missing. The polylines are cached
+    by rhodonea, the ones not cached yet are encoded all at once.
+    '''
+    def build_many(missing):
+        curves = [row['curve'] for row in missing]
+        if tolerance:
+            curves = [curve.simplify(tolerance) for curve in curves]
+        return encode_polylines(
+            [linestring_coords(curve) for curve in curves], precision
+        )
+
+    rows = [row for row in rows if row['curve'] is not None]
+    polylines = get_cached_many(
+        [
+            get_rhodonea_cache_key(
+                row['id'], row['modified'], 'polyline', precision, tolerance
+            )
+            for row in rows
+        ],
+        rows,
+        build_many,
+    )
+    return {row['id']: polyline for row, polyline in zip(rows, polylines)}
+
+
+class LayerDetailReadListSerializer(ListSerializer):
+    def to_representation(self, data):
+        return self.child.represent_many(list(data))
+
+
+class LayerDetailReadSerializer(BaseSerializer):
+    '''
+    Read only serializer giving the very same representation as
+    LayerDetailSerializer, only faster: the rhodoneas are fetched as rows of
+    values, which go through the fields of RhodoneaDetailSerializer without
+    model instances being built, and plain dicts are returned. Many layers
+    are represented with a single query for all their rhodoneas.
+
+    The curves are encoded polylines instead of GeoJSON when the context
+    holds a `polyline_precision`.
+    '''
+    class Meta:
+        list_serializer_class = LayerDetailReadListSerializer
+
+    def to_representation(self, layer):
+        return self.represent_many([layer])[0]
+
+    @instrumented('serialization')
+    def represent_many(self, layers):
+        layer_fields = [
+            f for name, f in LayerDetailSerializer(
+                context=self.context
+            ).fields.items()
+            if name != 'rhodoneas' and not f.write_only
+        ]
+        rhodonea_fields = [
+            f for f in RhodoneaDetailSerializer(
+                context=self.context
+            ).fields.values()
+            if not f.write_only
+        ]
+        sources = [f.source for f in rhodonea_fields]
+
+        precision = self.context.get('polyline_precision')
+        if precision is not None:
+            rhodonea_fields = [
+                f for f in rhodonea_fields if f.field_name != 'curve'
+            ]
+            sources.append('modified')
+
+        rows = list(Rhodonea.objects.filter(layer__in=layers).order_by(
+            'layer_id', 'pk'
+        ).values('layer_id', *sources))
+
+        polylines = {}
+        if precision is not None:
+            polylines = get_polylines(
+                rows, precision, self.context.get('tolerance')
+            )
+
+        rhodoneas = defaultdict(list)
+        for row in rows:
+            data = represent(rhodonea_fields, SimpleNamespace(**row))
+            if precision is not None:
+                data['curve'] = polylines.get(row['id'])
+            rhodoneas[row['layer_id']].append(data)
+
+        return [
+            {
+                **represent(layer_fields, layer),
+                'rhodoneas': rhodoneas[layer.pk],
+            }
+            for layer in layers
+        ]
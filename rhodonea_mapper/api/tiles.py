@@ -0,0 +1,115 @@
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from rest_framework.views import APIView
+
+from rhodonea_mapper.geometry import MAX_ZOOM, tile_bounds, zoom_resolution
+from rhodonea_mapper.models import Layer, Rhodonea
+
+
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+MERCATOR_MAX_LATITUDE = 85.0511287798066
+
+TILE_SQL = '''
+WITH
+bounds AS (
+    SELECT
+        ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 3857) AS geom,
+        ST_Transform(ST_Expand(
+            ST_MakeEnvelope(%(xmin)s, %(ymin)s, %(xmax)s, %(ymax)s, 3857),
+            %(margin)s
+        ), 4326) AS area
+),
+rhodoneas AS (
+    SELECT
+        rh.id,
+        rh.layer_id,
+        rh.name,
+        rh.stroke_color,
+        rh.stroke_weight,
+        ST_AsMVTGeom(
+            ST_Simplify(
+                ST_Transform(ST_ClipByBox2D(rh.curve, {world}), 3857),
+                %(tolerance)s
+            ),
+            bounds.geom, {extent}, {buffer}, true
+        ) AS geom
+    FROM {rhodonea_table} rh, bounds
+    WHERE rh.curve && bounds.area
+),
+layers AS (
+    SELECT
+        l.id,
+        l.title,
+        l.overlays_count,
+        ST_AsMVTGeom(
+            ST_Transform(ST_ClipByBox2D(l.envelope, {world}), 3857),
+            bounds.geom, {extent}, {buffer}, true
+        ) AS geom
+    FROM {layer_table} l, bounds
+    WHERE l.envelope && bounds.area
+)
+SELECT
+    COALESCE((
+        SELECT ST_AsMVT(rhodoneas, 'rhodoneas', {extent}, 'geom')
+        FROM rhodoneas WHERE geom IS NOT NULL
+    ), ''::bytea) ||
+    COALESCE((
+        SELECT ST_AsMVT(layers, 'layers', {extent}, 'geom')
+        FROM layers WHERE geom IS NOT NULL
+    ), ''::bytea)
+'''.format(
+    extent=MVT_EXTENT,
+    buffer=MVT_BUFFER,
+    # The area covered by Web Mercator, geometries must be clipped to it
+    # before being projected.
+    world='ST_MakeEnvelope(-180, {0}, 180, {1}, 4326)'.format(
+        -MERCATOR_MAX_LATITUDE, MERCATOR_MAX_LATITUDE
+    ),
+    rhodonea_table=Rhodonea._meta.db_table,
+    layer_table=Layer._meta.db_table,
+)
+
+
+def build_tile(z, x, y):
+    '''
+    Returns the Mapbox Vector Tile of the tile given holding two layers:
+    `rhodoneas`, the curves simplified according to the zoom level, and
+    `layers`, the envelopes of the layers.
+    '''
+    xmin, ymin, xmax, ymax = tile_bounds(z, x, y)
+    params = {
+        'xmin': xmin,
+        'ymin': ymin,
+        'xmax': xmax,
+        'ymax': ymax,
+        'margin': (xmax - xmin) * MVT_BUFFER / MVT_EXTENT,
+        'tolerance': zoom_resolution(z),
+    }
+
+    with connection.cursor() as cursor:
+        cursor.execute(TILE_SQL, params)
+        return bytes(cursor.fetchone()[0])
+
+
+class TilesView(APIView):
+    '''
+    Serves the rhodoneas and the layers as Mapbox Vector Tiles.
+    '''
+    content_type = 'application/vnd.mapbox-vector-tile'
+
+    def get(self, request, z, x, y):
+        if z > MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            raise Http404
+
+        response = HttpResponse(
+            build_tile(z, x, y), content_type=self.content_type
+        )
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=getattr(settings, 'RHODONEA_MAPPER_TILES_MAX_AGE', 300),
+        )
+        return response
@@ -1,8 +1,12 @@
 # pylint: disable=invalid-name
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 
+from rhodonea_mapper.api.clusters import ClustersView
+from rhodonea_mapper.api.export import ExportView
 from rhodonea_mapper.api.layers import LayersViewSet
+from rhodonea_mapper.api.metrics import MetricsView
+from rhodonea_mapper.api.tiles import TilesView
 
 
 router = DefaultRouter()
@@ -10,5 +14,19 @@ router.register('layers', LayersViewSet)
 
 
 urlpatterns = [
+    path(
+        'tiles/<int:z>/<int:x>/<int:y>.pbf', TilesView.as_view(), name='tile'
+    ),
+    path(
+        'clusters/<int:z>/<int:x>/<int:y>.json',
+        ClustersView.as_view(),
+        name='clusters',
+    ),
+    re_path(
+        r'^export\.(?P<output>geojson|ndjson)$',
+        ExportView.as_view(),
+        name='export',
+    ),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
 ]
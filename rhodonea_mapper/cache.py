@@ -0,0 +1,99 @@
+'''
+Cache of the representations of the layers and of the rhodoneas.
+
+Entries are keyed by object, its `modified` and the variant of the
+representation (e.g. the tolerance of the curves) so that any change to the
+object, and to a layer any change to its rhodoneas, which touches `modified`,
+invalidates them.
+'''
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def get_cache():
+    return caches[getattr(settings, 'RHODONEA_MAPPER_CACHE', 'default')]
+
+
+def get_cache_timeout():
+    return getattr(settings, 'RHODONEA_MAPPER_CACHE_TIMEOUT', 3600)
+
+
+def get_cache_key(kind, pk, modified, *variant):
+    return ':'.join([
+        'rhodonea_mapper',
+        kind,
+        str(pk),
+        str(modified.timestamp()),
+        *map(str, variant),
+    ])
+
+
+def get_layer_cache_key(layer, *variant):
+    return get_cache_key('layer', layer.pk, layer.modified, *variant)
+
+
+def get_rhodonea_cache_key(pk, modified, *variant):
+    return get_cache_key('rhodonea', pk, modified, *variant)
+
+
+def build_etag(data):
+    content = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return '"{}"'.format(hashlib.md5(content.encode()).hexdigest())
+
+
+def get_layer_payload(layer, build, *variant):
+    '''
+    Returns the ETag and the data of a representation of the layer, calling
+    `build` to get the data if not cached yet.
+    '''
+    cache = get_cache()
+    key = get_layer_cache_key(layer, *variant)
+
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        entry = (build_etag(data), data)
+        cache.set(key, entry, get_cache_timeout())
+
+    return entry
+
+
+def get_cached_many(keys, objs, build_many):
+    '''
+    Returns the list of the cached values of the keys given, reading and
+    writing the cache in bulk. `build_many` is called once with the objects
+    whose keys are not cached yet and returns the list of their values.
+    '''
+    cache = get_cache()
+
+    values = cache.get_many(keys)
+    missing = [(key, obj) for key, obj in zip(keys, objs) if key not in values]
+    if missing:
+        built = dict(zip(
+            [key for key, obj in missing],
+            build_many([obj for key, obj in missing]),
+        ))
+        cache.set_many(built, get_cache_timeout())
+        values.update(built)
+
+    return [values[key] for key in keys]
+
+
+def get_layers_payloads(layers, build_many, *variant):
+    '''
+    Returns the list of the ETags and the data of the representations of the
+    layers given, as `get_layer_payload` does, reading and writing the cache
+    in bulk. `build_many` is called once with the layers not cached yet and
+    returns the list of their data.
+    '''
+    return get_cached_many(
+        [get_layer_cache_key(layer, *variant) for layer in layers],
+        layers,
+        lambda missing: [
+            (build_etag(data), data) for data in build_many(missing)
+        ],
+    )
@@ -0,0 +1,96 @@
+'''
+Buffered overlays counters.
+
+Showing a layer must not cost a write to the database: the overlays are
+counted in memory and periodically flushed in bulk, every
+`RHODONEA_MAPPER_OVERLAYS_FLUSH_INTERVAL` seconds, by a background thread.
+When the interval is 0 (the default) they are written straight away.
+'''
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from rhodonea_mapper.models import Layer
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_flush_interval():
+    return getattr(settings, 'RHODONEA_MAPPER_OVERLAYS_FLUSH_INTERVAL', 0)
+
+
+class OverlaysCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._flusher = None
+
+    def add(self, *layer_ids):
+        '''
+        Counts one overlay for each of the layers given.
+        '''
+        with self._lock:
+            self._counts.update(layer_ids)
+
+        interval = get_flush_interval()
+        if interval:
+            self.start_flusher(interval)
+        else:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def flush(self):
+        '''
+        Writes the buffered counts to the database, returns the number of
+        layers updated.
+        '''
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+
+        if not counts:
+            return 0
+
+        try:
+            Layer.objects.add_overlays(counts)
+        except Exception:
+            # Keep the counts for the next attempt
+            with self._lock:
+                self._counts.update(counts)
+            raise
+
+        return len(counts)
+
+    def start_flusher(self, interval):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self.run_flusher,
+                args=(interval,),
+                name='rhodonea-mapper-overlays-flusher',
+                daemon=True,
+            )
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def run_flusher(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Flushing the overlays counters failed')
+            finally:
+                close_old_connections()
+
+
+overlays_counter = OverlaysCounter()
@@ -0,0 +1,137 @@
+'''
+Streaming export of the layers along with their rhodoneas.
+
+Every layer is written as a GeoJSON Feature whose geometry is its envelope,
+its rhodoneas being nested in its properties as Features whose geometry is
+their centre. Layers and rhodoneas are read through two server-side cursors
+walked side by side, hence neither the whole dataset nor a query per layer
+is ever needed.
+'''
+import json
+from itertools import groupby
+from operator import itemgetter
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from rhodonea_mapper.geometry import to_wgs84
+from rhodonea_mapper.models import Layer, Rhodonea
+
+
+DEFAULT_CHUNK_SIZE = 2000
+
+LAYER_FIELDS = [
+    'id',
+    'title',
+    'notes',
+    'overlays_count',
+    'created',
+    'modified',
+]
+
+RHODONEA_FIELDS = [
+    'id',
+    'name',
+    'notes',
+    'r',
+    'n',
+    'd',
+    'rotation',
+    'nodes_count',
+    'stroke_color',
+    'stroke_weight',
+    'created',
+    'modified',
+]
+
+
+def to_geojson(geometry):
+    if geometry is None:
+        return None
+    geometry = to_wgs84(geometry)
+    return {'type': geometry.geom_type, 'coordinates': geometry.coords}
+
+
+def build_feature(row, fields, geometry, **properties):
+    return {
+        'type': 'Feature',
+        'id': row['id'],
+        'geometry': to_geojson(row[geometry]),
+        'properties': {
+            **{field: row[field] for field in fields if field != 'id'},
+            **properties,
+        },
+    }
+
+
+def iter_features(layers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Yields the features of the layers given (all of them by default) ordered
+    by id.
+    '''
+    rhodoneas = Rhodonea.objects.all()
+    if layers is None:
+        layers = Layer.objects.all()
+    else:
+        rhodoneas = rhodoneas.filter(layer__in=layers.values('pk'))
+
+    layers = layers.order_by('pk').values(
+        *LAYER_FIELDS, 'envelope'
+    ).iterator(chunk_size=chunk_size)
+    rhodoneas = rhodoneas.order_by('layer_id', 'pk').values(
+        *RHODONEA_FIELDS, 'layer_id', 'point'
+    ).iterator(chunk_size=chunk_size)
+
+    groups = groupby(rhodoneas, key=itemgetter('layer_id'))
+    layer_id, group = next(groups, (None, None))
+
+    for layer in layers:
+        layer_rhodoneas = []
+        # Both cursors are sorted by layer, skip the rhodoneas of layers
+        # created meanwhile.
+        while layer_id is not None and layer_id <= layer['id']:
+            if layer_id == layer['id']:
+                layer_rhodoneas = [
+                    build_feature(rh, RHODONEA_FIELDS, 'point')
+                    for rh in group
+                ]
+            layer_id, group = next(groups, (None, None))
+
+        yield build_feature(
+            layer, LAYER_FIELDS, 'envelope', rhodoneas=layer_rhodoneas
+        )
+
+
+def dumps(feature):
+    return json.dumps(feature, cls=JSONEncoder)
+
+
+def iter_ndjson(features):
+    '''
+    Yields the features one per line (newline delimited JSON).
+    '''
+    for feature in features:
+        yield dumps(feature) + '\n'
+
+
+def iter_geojson(features):
+    '''
+    Yields the chunks of a GeoJSON FeatureCollection holding the features.
+    '''
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = '\n'
+    for feature in features:
+        yield separator + dumps(feature)
+        separator = ',\n'
+    yield '\n]}\n'
+
+
+# Name: (writer, content type)
+EXPORT_FORMATS = {
+    'geojson': (iter_geojson, 'application/geo+json'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+}
+
+
+def iter_export(output, layers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    writer = EXPORT_FORMATS[output][0]
+    return writer(iter_features(layers, chunk_size))
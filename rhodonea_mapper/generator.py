@@ -0,0 +1,218 @@
+'''
+Synthetic datasets for capacity testing.
+
+Layers are generated in batches, each one drawn from its own random stream
+spawned from the seed given, hence the dataset only depends on the seed
+whatever the number of processes. The random parameters and the geometries
+of a batch are computed with NumPy by a pool of worker processes while the
+main process bulk inserts the batches already computed.
+'''
+import math
+from decimal import Decimal
+from multiprocessing import Pool
+
+import numpy as np
+from django.contrib.gis.geos import LineString, Point, Polygon
+from django.db import connections, transaction
+from django.utils import timezone
+
+from rhodonea_mapper.geometry import (
+    WGS84_GEOD,
+    build_curves_coords,
+    envelopes_extents,
+)
+from rhodonea_mapper.models import Layer, Rhodonea
+
+
+DISTRIBUTIONS = ['uniform', 'clustered']
+
+# Number of the areas the layers gather around with the clustered
+# distribution and their standard deviation in degrees.
+HOTSPOTS_COUNT = 16
+HOTSPOTS_SPREAD = 1.5
+
+MAX_LATITUDE = 80
+
+
+def random_centres(rng, count):
+    '''
+    Returns the coordinates of points uniformly distributed over the sphere,
+    polar regions excluded.
+    '''
+    lngs = rng.uniform(-180, 180, count)
+    lats = np.degrees(np.arcsin(
+        rng.uniform(-1, 1, count) * math.sin(math.radians(MAX_LATITUDE))
+    ))
+    return lngs, lats
+
+
+def generate_layers_centres(rng, count, distribution, hotspots):
+    if distribution == 'uniform':
+        return random_centres(rng, count)
+
+    index = rng.integers(0, len(hotspots[0]), count)
+    lngs = hotspots[0][index] + rng.normal(0, HOTSPOTS_SPREAD, count)
+    lats = hotspots[1][index] + rng.normal(0, HOTSPOTS_SPREAD, count)
+    return (
+        (lngs + 180) % 360 - 180,
+        np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE),
+    )
+
+
+def generate_batch(args):
+    '''
+    Returns the parameters and the geometries of a batch of layers as NumPy
+    arrays, one item per rhodonea but `counts`, the number of rhodoneas of
+    each layer.
+    '''
+    (seed, layers_count, rhodoneas_range, nodes_range, distribution,
+     hotspots) = args
+    rng = np.random.default_rng(seed)
+
+    counts = rng.integers(
+        rhodoneas_range[0], rhodoneas_range[1] + 1, layers_count
+    )
+    total = counts.sum()
+    centres = generate_layers_centres(
+        rng, layers_count, distribution, hotspots
+    )
+
+    # The rhodoneas are scattered 3 to 5 km off the centre of their layer
+    layer_index = np.repeat(np.arange(layers_count), counts)
+    lngs, lats, _ = WGS84_GEOD.fwd(
+        centres[0][layer_index],
+        centres[1][layer_index],
+        rng.uniform(0, 360, total),
+        rng.uniform(3000, 5000, total),
+    )
+
+    batch = {
+        'counts': counts,
+        'lngs': lngs,
+        'lats': lats,
+        # r and rotation are in hundredths as they have two decimal places
+        'r': rng.integers(100000, 1000000, total),
+        'n': rng.integers(1, 11, total),
+        'd': rng.integers(1, 11, total),
+        'rotation': rng.integers(-36000, 36000, total),
+        'nodes_count': rng.integers(
+            nodes_range[0], nodes_range[1] + 1, total
+        ),
+        'stroke_color': rng.integers(0, 0x1000000, total),
+        'stroke_weight': rng.integers(1, 5, total),
+    }
+
+    batch['curves'] = build_curves_coords(zip(
+        lngs, lats, batch['r'] / 100, batch['n'], batch['d'],
+        batch['rotation'] / 100, batch['nodes_count'],
+    ))
+    batch['extents'] = envelopes_extents(lngs, lats, batch['r'] / 100)
+
+    return batch
+
+
+def save_batch(batch, first_layer):
+    '''
+    Inserts the layers and the rhodoneas of a batch generated, returns the
+    number of rhodoneas inserted.
+    '''
+    now = timezone.now()
+    extents = batch['extents']
+
+    layers, rhodoneas = [], []
+    start = 0
+    for i, count in enumerate(batch['counts']):
+        layer = Layer(
+            title=f'Synthetic layer {first_layer + i}', created=now
+        )
+        layers.append(layer)
+
+        if not count:
+            continue
+
+        # The bounding box of the bounding boxes of the rhodoneas
+        layer.envelope = Polygon.from_bbox((
+            *extents[start:start + count, :2].min(axis=0),
+            *extents[start:start + count, 2:].max(axis=0),
+        )).envelope
+
+        for j in range(start, start + count):
+            rhodoneas.append(Rhodonea(
+                layer=layer,
+                name=f'Synthetic rhodonea {j - start} of {layer.title}',
+                point=Point(batch['lngs'][j], batch['lats'][j], srid=4326),
+                r=Decimal(int(batch['r'][j])).scaleb(-2),
+                n=int(batch['n'][j]),
+                d=int(batch['d'][j]),
+                rotation=Decimal(int(batch['rotation'][j])).scaleb(-2),
+                nodes_count=int(batch['nodes_count'][j]),
+                stroke_color='#{:06x}'.format(batch['stroke_color'][j]),
+                stroke_weight=int(batch['stroke_weight'][j]),
+                curve=LineString(batch['curves'][j], srid=4326),
+                envelope=Polygon.from_bbox(extents[j]).envelope,
+                created=now,
+            ))
+        start += count
+
+    with transaction.atomic():
+        Layer.objects.bulk_create(layers)
+        # The layers got their ids only now
+        for rh in rhodoneas:
+            rh.layer_id = rh.layer.pk
+        Rhodonea.objects.bulk_create(rhodoneas)
+
+    return len(rhodoneas)
+
+
+def generate(
+    layers_count,
+    rhodoneas_range=(1, 5),
+    nodes_range=(100, 1000),
+    distribution='uniform',
+    seed=None,
+    processes=None,
+    batch_size=1000,
+    callback=None,
+):
+    '''
+    Generates and inserts `layers_count` random layers, `batch_size` at a
+    time, each one holding a random number of rhodoneas within
+    `rhodoneas_range`. Returns the number of layers and rhodoneas inserted,
+    calling `callback` with them after each batch.
+    '''
+    seed_sequence = np.random.SeedSequence(seed)
+    hotspots = random_centres(
+        np.random.default_rng(seed_sequence.spawn(1)[0]), HOTSPOTS_COUNT
+    )
+
+    batches_sizes = [
+        min(batch_size, layers_count - start)
+        for start in range(0, layers_count, batch_size)
+    ]
+    tasks = [
+        (batch_seed, size, rhodoneas_range, nodes_range, distribution,
+         hotspots)
+        for batch_seed, size in zip(
+            seed_sequence.spawn(len(batches_sizes)), batches_sizes
+        )
+    ]
+
+    layers_done = rhodoneas_done = 0
+
+    def save(batches):
+        nonlocal layers_done, rhodoneas_done
+        for batch in batches:
+            rhodoneas_done += save_batch(batch, layers_done)
+            layers_done += len(batch['counts'])
+            if callback is not None:
+                callback(layers_done, rhodoneas_done)
+
+    if processes == 1:
+        save(map(generate_batch, tasks))
+    else:
+        # The connections must not be shared with the forked workers
+        connections.close_all()
+        with Pool(processes) as pool:
+            save(pool.imap(generate_batch, tasks))
+
+    return layers_done, rhodoneas_done
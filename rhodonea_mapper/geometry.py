@@ -0,0 +1,337 @@
+'''
+Server side generation of rhodonea curves.
+
+A rhodonea of parameters n, d is sampled on `nodes_count + 1` polar angles
+theta and every node is placed at a geodesic distance r * sin(n / d * theta)
+from the centre, bearing theta (plus the rotation of the curve). This mirrors
+`RhodoneaMapper.buildRhodonea` in the client but solves all the geodesic
+offsets of one or many curves with a single batched `Geod.fwd` call.
+
+The shape of a rhodonea only depends on n, d, rotation and nodes_count, the
+centre and the radius just place it: the unit curves are kept in an LRU
+cache (`shapes_cache`) so that only the placement runs for every rhodonea.
+'''
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.contrib.gis.geos import LineString, Polygon
+from django.conf import settings
+from pyproj import Geod
+
+from rhodonea_mapper.instrumentation import instrumented, metrics
+
+
+WGS84_GEOD = Geod(ellps='WGS84')
+
+# Half the side of the square covered by the Web Mercator (EPSG:3857) tiles.
+WEB_MERCATOR_HALF_SIZE = 20037508.342789244
+MAX_ZOOM = 22
+
+
+def build_rhodonea_polar(n, d, rotation, nodes_count):
+    '''
+    Returns the bearings (in degrees) and the normalised radii of the nodes of
+    a rhodonea whose radius is 1.
+    '''
+    laps = math.ceil(d)
+    theta = np.linspace(0, 2 * np.pi * laps, nodes_count + 1)
+    bearings = np.degrees(theta) + 90 + float(rotation)
+    radii = np.sin(n / d * theta)
+    return bearings, radii
+
+
+class ShapesCache:
+    '''
+    LRU cache of the unit curves built by `build_rhodonea_polar`, holding at
+    most `RHODONEA_MAPPER_SHAPES_CACHE_SIZE` of them (0 disables it). The
+    arrays returned are shared, hence read-only.
+    '''
+    DEFAULT_MAX_SIZE = 1024
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    @property
+    def max_size(self):
+        return getattr(
+            settings, 'RHODONEA_MAPPER_SHAPES_CACHE_SIZE',
+            self.DEFAULT_MAX_SIZE,
+        )
+
+    def clear(self):
+        with self._lock:
+            self._shapes = OrderedDict()
+            self.hits = self.misses = self.evictions = 0
+
+    def get(self, n, d, rotation, nodes_count):
+        key = (float(n), float(d), float(rotation), int(nodes_count))
+        with self._lock:
+            shape = self._shapes.get(key)
+            if shape is not None:
+                self.hits += 1
+                self._shapes.move_to_end(key)
+                return shape
+            self.misses += 1
+
+        shape = build_rhodonea_polar(n, d, rotation, nodes_count)
+        for array in shape:
+            array.flags.writeable = False
+
+        with self._lock:
+            self._shapes[key] = shape
+            while len(self._shapes) > self.max_size:
+                self._shapes.popitem(last=False)
+                self.evictions += 1
+        return shape
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._shapes),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def collect(self):
+        stats = self.stats()
+        return [
+            ('shapes_cache_size', 'gauge', 'Shapes cached.', [
+                ((), stats['size'])
+            ]),
+            ('shapes_cache_max_size', 'gauge', 'Shapes cached at most.', [
+                ((), stats['max_size'])
+            ]),
+            *[
+                (f'shapes_cache_{name}_total', 'counter', help_text, [
+                    ((), stats[name])
+                ])
+                for name, help_text in [
+                    ('hits', 'Shapes found in the cache.'),
+                    ('misses', 'Shapes missing from the cache.'),
+                    ('evictions', 'Shapes evicted from the cache.'),
+                ]
+            ],
+        ]
+
+
+shapes_cache = ShapesCache()
+metrics.register(shapes_cache.collect)
+
+
+def rhodonea_polar(n, d, rotation, nodes_count):
+    '''
+    Returns the read-only bearings (in degrees) and normalised radii of the
+    nodes of a rhodonea whose radius is 1, as cached by `shapes_cache`.
+    '''
+    return shapes_cache.get(n, d, rotation, nodes_count)
+
+
+@instrumented('build_curves')
+def build_curves_coords(params):
+    '''
+    Given an iterable of tuples (lng, lat, r, n, d, rotation, nodes_count)
+    returns the list of the (nodes_count + 1, 2) arrays of coordinates of the
+    related curves. The geodesic offsets of all the curves are computed at
+    once.
+    '''
+    lngs, lats, bearings, distances, sizes = [], [], [], [], []
+
+    for lng, lat, r, n, d, rotation, nodes_count in params:
+        b, radii = rhodonea_polar(n, d, rotation, nodes_count)
+        lngs.append(np.full(b.size, lng, dtype=float))
+        lats.append(np.full(b.size, lat, dtype=float))
+        bearings.append(b)
+        distances.append(radii * float(r))
+        sizes.append(b.size)
+
+    if not sizes:
+        return []
+
+    x, y, _ = WGS84_GEOD.fwd(
+        np.concatenate(lngs),
+        np.concatenate(lats),
+        np.concatenate(bearings),
+        np.concatenate(distances),
+    )
+    coords = np.column_stack((x, y))
+
+    return np.split(coords, np.cumsum(sizes)[:-1])
+
+
+@instrumented('build_envelopes')
+def envelopes_extents(lngs, lats, radii):
+    '''
+    Returns the (N, 4) array of the bounding boxes (xmin, ymin, xmax, ymax)
+    of the rhodoneas centred on the points given, i.e. of the points reached
+    heading west, south, east and north by their radii, all at once.
+    '''
+    lngs, lats, radii = (
+        np.asarray(a, dtype=float) for a in (lngs, lats, radii)
+    )
+    if not lngs.size:
+        return np.empty((0, 4))
+
+    x, y, _ = WGS84_GEOD.fwd(
+        np.repeat(lngs, 4),
+        np.repeat(lats, 4),
+        np.tile([-90., 180., 90., 0.], lngs.size),
+        np.repeat(radii, 4),
+    )
+    x, y = x.reshape(-1, 4), y.reshape(-1, 4)
+    return np.column_stack((x[:, 0], y[:, 1], x[:, 2], y[:, 3]))
+
+
+@instrumented('encode_polylines')
+def encode_polylines(curves, precision=5):
+    '''
+    Returns the Google encoded polylines of the curves given as (N, 2) arrays
+    of longitudes and latitudes, all of them being encoded at once.
+    '''
+    sizes = np.array([len(c) for c in curves], dtype=int)
+    if not sizes.sum():
+        return ['' for c in curves]
+
+    # Latitude first, as integers
+    points = np.rint(
+        np.concatenate([np.asarray(c, dtype=float).reshape(-1, 2)
+                        for c in curves])[:, ::-1] * 10 ** precision
+    ).astype(np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), np.int64))
+    starts = (np.cumsum(sizes) - sizes)[sizes > 0]
+    deltas[starts] = points[starts]
+
+    # Zigzag, then little-endian chunks of 5 bits, each but the last one
+    # flagged by 0x20.
+    values = (deltas.ravel() << 1) ^ (deltas.ravel() >> 63)
+    chunks_count = np.ones(values.size, dtype=int)
+    max_chunks = 1
+    while (values >> (5 * max_chunks)).any():
+        chunks_count += (values >> (5 * max_chunks)) > 0
+        max_chunks += 1
+
+    shifts = 5 * np.arange(max_chunks)
+    chunks = (values[:, None] >> shifts) & 0x1f
+    index = np.arange(max_chunks)
+    chunks |= np.where(index < chunks_count[:, None] - 1, 0x20, 0)
+    chars = (chunks + 63)[index < chunks_count[:, None]]
+
+    text = chars.astype(np.uint8).tobytes().decode('ascii')
+    lengths = np.zeros(len(curves), dtype=int)
+    lengths[sizes > 0] = np.add.reduceat(
+        chunks_count.reshape(-1, 2).sum(axis=1), starts
+    )
+    ends = np.cumsum(lengths)
+    return [text[end - length:end] for end, length in zip(ends, lengths)]
+
+
+def linestring_coords(line):
+    '''
+    Returns the (N, 2) array of the coordinates of the LineString given,
+    read straight from its WKB when 2D and little-endian.
+    '''
+    wkb = bytes(line.wkb)
+    if wkb[0] == 1 and not line.hasz:
+        return np.frombuffer(wkb, dtype='<f8', offset=9).reshape(-1, 2)
+    return np.asarray(line.coords, dtype=float)[:, :2]
+
+
+def to_wgs84(point):
+    if point.srid and point.srid != 4326:
+        return point.transform(4326, clone=True)
+    return point
+
+
+def get_curve_params(rhodonea):
+    point = to_wgs84(rhodonea.point)
+    return (
+        point.x,
+        point.y,
+        rhodonea.r,
+        rhodonea.n,
+        rhodonea.d,
+        rhodonea.rotation,
+        rhodonea.nodes_count,
+    )
+
+
+def build_curves(rhodoneas):
+    '''
+    Returns the list of LineString objects tracing the curves of the rhodoneas
+    given, in the same order.
+    '''
+    return [
+        LineString(coords, srid=4326)
+        for coords in build_curves_coords(map(get_curve_params, rhodoneas))
+    ]
+
+
+def build_curve(rhodonea):
+    return build_curves([rhodonea])[0]
+
+
+def union_envelopes(envelopes):
+    '''
+    Returns the envelope of the bounding boxes given, None if there are none.
+    '''
+    extents = [e.extent for e in envelopes if e is not None]
+    if not extents:
+        return None
+
+    xmin, ymin, xmax, ymax = zip(*extents)
+    return Polygon.from_bbox(
+        (min(xmin), min(ymin), max(xmax), max(ymax))
+    ).envelope
+
+
+def covers_envelope(outer, inner):
+    oxmin, oymin, oxmax, oymax = outer.extent
+    ixmin, iymin, ixmax, iymax = inner.extent
+    return (
+        oxmin <= ixmin and oymin <= iymin and
+        ixmax <= oxmax and iymax <= oymax
+    )
+
+
+def touches_envelope_boundary(outer, inner):
+    '''
+    Whether the bounding box `inner` reaches the boundary of `outer`, i.e.
+    whether `outer` may shrink when `inner` is removed from it.
+    '''
+    oxmin, oymin, oxmax, oymax = outer.extent
+    ixmin, iymin, ixmax, iymax = inner.extent
+    return (
+        ixmin <= oxmin or iymin <= oymin or
+        ixmax >= oxmax or iymax >= oymax
+    )
+
+
+def tile_bounds(z, x, y):
+    '''
+    Returns the bounds (xmin, ymin, xmax, ymax) in EPSG:3857 of the XYZ tile
+    given.
+    '''
+    size = 2 * WEB_MERCATOR_HALF_SIZE / 2 ** z
+    xmin = -WEB_MERCATOR_HALF_SIZE + x * size
+    ymax = WEB_MERCATOR_HALF_SIZE - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def zoom_resolution(z, tile_size=256):
+    '''
+    Returns the size in EPSG:3857 units (metres at the equator) of a pixel of
+    a tile at zoom level z.
+    '''
+    return 2 * WEB_MERCATOR_HALF_SIZE / (tile_size * 2 ** z)
+
+
+def zoom_tolerance(z, tile_size=256):
+    '''
+    Returns the size in degrees of a pixel of a tile at zoom level z, the
+    tolerance curves can be simplified by without visible changes.
+    '''
+    return 360 / (tile_size * 2 ** z)
@@ -0,0 +1,217 @@
+'''
+Bulk import of the layers dumps written by `rhodonea_mapper.export`.
+
+Dumps are parsed as a stream and imported in batches: the objects of a batch
+are validated field by field without touching the database, then layers and
+rhodoneas are inserted with one `bulk_create` each. No signal is sent, the
+envelope of a layer is computed once from the ones of its rhodoneas.
+'''
+import json
+from decimal import Decimal
+
+from django.contrib.gis.geos import Point
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from rhodonea_mapper.geometry import union_envelopes
+from rhodonea_mapper.models import Layer, Rhodonea, fill_geometries
+
+
+DEFAULT_BATCH_SIZE = 5000
+
+LAYER_FIELDS = ['title', 'notes', 'overlays_count', 'created']
+
+RHODONEA_FIELDS = [
+    'name',
+    'notes',
+    'r',
+    'n',
+    'd',
+    'rotation',
+    'nodes_count',
+    'stroke_color',
+    'stroke_weight',
+    'created',
+]
+
+
+def iter_ndjson_features(f):
+    for line in f:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_geojson_features(f, chunk_size=2 ** 16):
+    '''
+    Yields one by one the features of the GeoJSON FeatureCollection read from
+    the file given, holding in memory no more than a chunk and a feature.
+    '''
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+
+    def read():
+        nonlocal buffer, eof
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+    # Seek the beginning of the features array
+    while True:
+        start = buffer.find('"features"')
+        if start >= 0 and buffer.find('[', start) >= 0:
+            buffer = buffer[buffer.find('[', start) + 1:]
+            break
+        if eof:
+            raise ValueError('The features array was not found.')
+        read()
+
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+
+        try:
+            feature, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The feature goes on in the next chunk
+            if eof:
+                raise ValueError('The features array is truncated.')
+            buffer, pos = buffer[pos:], 0
+            read()
+            continue
+
+        yield feature
+
+
+def get_properties(feature, fields):
+    properties = feature.get('properties') or {}
+    return {
+        field: properties[field] for field in fields if field in properties
+    }
+
+
+def build_layer(feature):
+    layer = Layer(**get_properties(feature, LAYER_FIELDS))
+    layer.clean_fields(exclude=['envelope'])
+    return layer
+
+
+def build_rhodonea(feature):
+    data = get_properties(feature, RHODONEA_FIELDS)
+    for field in ['r', 'rotation']:
+        if isinstance(data.get(field), float):
+            data[field] = Decimal(str(data[field]))
+
+    try:
+        lng, lat = feature['geometry']['coordinates'][:2]
+        point = Point(float(lng), float(lat), srid=4326)
+    except (KeyError, TypeError, ValueError):
+        raise ValidationError({'point': ['Invalid GeoJSON point.']})
+
+    rhodonea = Rhodonea(point=point, **data)
+    rhodonea.clean_fields(exclude=['layer', 'curve', 'envelope'])
+
+    if rhodonea.d == 0:
+        raise ValidationError({'d': ['This value cannot be zero.']})
+    if rhodonea.nodes_count <= 0:
+        raise ValidationError({
+            'nodes_count': ['Ensure this value is greater than 0.']
+        })
+
+    return rhodonea
+
+
+def build_batch(features, offset=0):
+    '''
+    Returns the list of the pairs (layer, rhodoneas) built from the features
+    given, raises a ValidationError listing all the invalid ones by index.
+    '''
+    batch, errors = [], {}
+
+    for index, feature in enumerate(features, offset):
+        try:
+            layer = build_layer(feature)
+            rhodoneas = [
+                build_rhodonea(rh_feature)
+                for rh_feature in feature['properties'].get('rhodoneas', [])
+            ]
+        except ValidationError as e:
+            errors[f'feature {index}'] = e.messages
+        except (KeyError, TypeError, AttributeError):
+            errors[f'feature {index}'] = ['Invalid GeoJSON feature.']
+        else:
+            batch.append((layer, rhodoneas))
+
+    if errors:
+        raise ValidationError(errors)
+
+    return batch
+
+
+def save_batch(batch):
+    '''
+    Inserts the layers and the rhodoneas of the batch, returns the number of
+    rhodoneas inserted.
+    '''
+    rhodoneas = [
+        rh for layer, layer_rhodoneas in batch for rh in layer_rhodoneas
+    ]
+    fill_geometries(rhodoneas)
+
+    now = timezone.now()
+    layers = []
+    for layer, layer_rhodoneas in batch:
+        if not layer.created:
+            layer.created = now
+        layer.envelope = union_envelopes(
+            rh.envelope for rh in layer_rhodoneas
+        )
+        layers.append(layer)
+
+    Layer.objects.bulk_create(layers)
+
+    for layer, layer_rhodoneas in batch:
+        for rh in layer_rhodoneas:
+            rh.layer = layer
+    Rhodonea.objects.bulk_create(rhodoneas)
+
+    return len(rhodoneas)
+
+
+def import_features(features, batch_size=DEFAULT_BATCH_SIZE, callback=None):
+    '''
+    Imports the layers features given within a single transaction, in batches
+    of about `batch_size` rhodoneas. Returns the number of layers and
+    rhodoneas imported, calling `callback` with them after each batch.
+    '''
+    layers_count = rhodoneas_count = 0
+    pending, pending_size = [], 0
+
+    def flush():
+        nonlocal layers_count, rhodoneas_count, pending, pending_size
+        rhodoneas_count += save_batch(build_batch(pending, layers_count))
+        layers_count += len(pending)
+        pending, pending_size = [], 0
+        if callback is not None:
+            callback(layers_count, rhodoneas_count)
+
+    with transaction.atomic():
+        for feature in features:
+            pending.append(feature)
+            pending_size += 1
+            try:
+                pending_size += len(feature['properties']['rhodoneas'])
+            except (KeyError, TypeError):
+                pass  # Reported by the validation of the batch
+            if pending_size >= batch_size:
+                flush()
+
+        if pending:
+            flush()
+
+    return layers_count, rhodoneas_count
@@ -0,0 +1,251 @@
+'''
+Opt-in instrumentation of the requests.
+
+Once `InstrumentationMiddleware` is added to `MIDDLEWARE` (after
+`AuthenticationMiddleware`) every request records its wall time, the number
+and the time of its database queries and the calls and the time of the hot
+sections of the app marked with `instrumented`: serialization, envelopes and
+curves computations. Each request is logged as a JSON record by the
+`rhodonea_mapper.instrumentation` logger and summed up in `metrics`, served
+in the Prometheus text format by `api/metrics` along with the samples of the
+collectors registered (e.g. the stats of the cache of the rhodonea shapes).
+
+Requests can be profiled as well, either a random sample of them
+(`RHODONEA_MAPPER_PROFILE_SAMPLE_RATE`) or the ones of staff users sending
+the `X-Rhodonea-Mapper-Profile` header: their cProfile stats are dumped in
+`RHODONEA_MAPPER_PROFILE_DIR`.
+'''
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'HTTP_X_RHODONEA_MAPPER_PROFILE'
+
+_current = ContextVar('rhodonea_mapper_request_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        # Name: [calls, seconds]
+        self.sections = defaultdict(lambda: [0, 0.0])
+
+    def add_section(self, name, seconds):
+        section = self.sections[name]
+        section[0] += 1
+        section[1] += seconds
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+
+def instrumented(name):
+    '''
+    Decorator recording the calls and the time spent in the function within
+    the section given of the stats of the current request, if any.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = _current.get()
+            if stats is None:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.add_section(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class Metrics:
+    '''
+    Totals of the requests instrumented by this process, by view.
+    '''
+    PREFIX = 'rhodonea_mapper'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.collectors = []
+        self.reset()
+
+    def register(self, collector):
+        '''
+        Registers a callable returning the list of the metrics to render
+        along with the ones of the requests, as tuples (name, kind, help
+        text, samples), each sample being a pair (labels, value).
+        '''
+        self.collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)
+            self.totals = defaultdict(int)
+            self.sections = defaultdict(lambda: [0, 0.0])
+
+    def record(self, view, method, status, seconds, stats):
+        with self._lock:
+            self.requests[(view, method, str(status))] += 1
+            self.totals[('request_seconds', view)] += seconds
+            self.totals[('db_queries', view)] += stats.db_queries
+            self.totals[('db_seconds', view)] += stats.db_seconds
+            for name, (calls, section_seconds) in stats.sections.items():
+                section = self.sections[(view, name)]
+                section[0] += calls
+                section[1] += section_seconds
+
+    def render(self):
+        '''
+        Returns the metrics in the Prometheus text exposition format.
+        '''
+        lines = []
+
+        def add(name, kind, help_text, samples):
+            name = f'{self.PREFIX}_{name}'
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(samples):
+                labels = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(
+                    f'{name}{{{labels}}} {value}' if labels
+                    else f'{name} {value}'
+                )
+
+        with self._lock:
+            add('requests_total', 'counter', 'Requests served.', [
+                ((('view', view), ('method', method), ('status', status)), n)
+                for (view, method, status), n in self.requests.items()
+            ])
+            for key, help_text in [
+                ('request_seconds', 'Time spent serving the requests.'),
+                ('db_queries', 'Database queries run.'),
+                ('db_seconds', 'Time spent running database queries.'),
+            ]:
+                add(f'{key}_total', 'counter', help_text, [
+                    ((('view', view),), value)
+                    for (total, view), value in self.totals.items()
+                    if total == key
+                ])
+            add('section_calls_total', 'counter', 'Calls of hot sections.', [
+                ((('view', view), ('section', name)), calls)
+                for (view, name), (calls, s) in self.sections.items()
+            ])
+            add(
+                'section_seconds_total', 'counter',
+                'Time spent in hot sections.',
+                [
+                    ((('view', view), ('section', name)), s)
+                    for (view, name), (calls, s) in self.sections.items()
+                ],
+            )
+
+        for collector in self.collectors:
+            for name, kind, help_text, samples in collector():
+                add(name, kind, help_text, samples)
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        if PROFILE_HEADER in request.META:
+            user = getattr(request, 'user', None)
+            return bool(user and user.is_staff)
+
+        rate = getattr(settings, 'RHODONEA_MAPPER_PROFILE_SAMPLE_RATE', 0)
+        return rate > 0 and random.random() < rate
+
+    def dump_profile(self, request, profile):
+        directory = getattr(
+            settings, 'RHODONEA_MAPPER_PROFILE_DIR', tempfile.gettempdir()
+        )
+        name = 'rhodonea_mapper-{}-{}-{}.prof'.format(
+            datetime.now().strftime('%Y%m%d%H%M%S%f'),
+            get_view_name(request).replace(':', '_'),
+            os.getpid(),
+        )
+        profile.dump_stats(os.path.join(directory, name))
+        return name
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        profile = cProfile.Profile() if self.should_profile(request) else None
+
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(stats.execute_wrapper)
+                    )
+                if profile is not None:
+                    profile.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profile is not None:
+                        profile.disable()
+        finally:
+            _current.reset(token)
+        seconds = time.perf_counter() - start
+
+        view = get_view_name(request)
+        metrics.record(
+            view, request.method, response.status_code, seconds, stats
+        )
+
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'seconds': seconds,
+            'db_queries': stats.db_queries,
+            'db_seconds': stats.db_seconds,
+            'sections': {
+                name: {'calls': calls, 'seconds': section_seconds}
+                for name, (calls, section_seconds) in stats.sections.items()
+            },
+        }
+        if profile is not None:
+            record['profile'] = self.dump_profile(request, profile)
+            response['X-Rhodonea-Mapper-Profile'] = record['profile']
+
+        logger.info(json.dumps(record))
+        return response
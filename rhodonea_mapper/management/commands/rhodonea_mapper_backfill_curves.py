@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from rhodonea_mapper.models import Rhodonea, fill_geometries
+
+
+class Command(BaseCommand):
+    help = 'Compute and store curves and envelopes of the Rhodonea objects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of rhodoneas processed per query (default 500).',
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Recompute the geometries already stored as well.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+
+        rhodoneas = Rhodonea.objects.order_by('pk').only(
+            'pk', *Rhodonea.CURVE_FIELDS
+        )
+        if not options['all']:
+            rhodoneas = rhodoneas.filter(
+                Q(curve__isnull=True) | Q(envelope__isnull=True)
+            )
+
+        self.stdout.write(self.style.WARNING(
+            f'Found {rhodoneas.count()} rhodoneas to backfill'
+        ))
+
+        last_pk = 0
+        done = 0
+        while True:
+            chunk = list(rhodoneas.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+
+            for rh in chunk:
+                rh.curve = None
+                rh.envelope = None
+            fill_geometries(chunk)
+            Rhodonea.objects.bulk_update(chunk, ['curve', 'envelope'])
+
+            last_pk = chunk[-1].pk
+            done += len(chunk)
+            self.stdout.write(self.style.WARNING(f'\t{done} rhodoneas'))
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {done} rhodoneas'))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from rhodonea_mapper.export import (
+    DEFAULT_CHUNK_SIZE,
+    EXPORT_FORMATS,
+    iter_export,
+)
+
+
+class Command(BaseCommand):
+    help = 'Export the Layer objects along with their Rhodonea objects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=sorted(EXPORT_FORMATS), default='ndjson',
+            help='GeoJSON FeatureCollection or one feature per line '
+                 '(default ndjson).',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Path of the file to write, - for stdout (default).',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Number of rows fetched at a time from the database '
+                 f'(default {DEFAULT_CHUNK_SIZE}).',
+        )
+
+    def handle(self, *args, **options):
+        chunks = iter_export(
+            options['format'], chunk_size=options['chunk_size']
+        )
+
+        if options['output'] == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w') as f:
+            f.writelines(chunks)
+
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported the layers to {options["output"]}'
+        ))
@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from rhodonea_mapper.generator import DISTRIBUTIONS, generate
+from rhodonea_mapper.models import Layer, Rhodonea
+
+
+class Command(BaseCommand):
+    help = 'Create large amounts of random Layer and Rhodonea objects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--layers', type=int, default=1000,
+            help='Number of layers to create (default 1000).',
+        )
+        parser.add_argument(
+            '--min-rhodoneas', type=int, default=1,
+            help='Minimum number of rhodoneas per layer (default 1).',
+        )
+        parser.add_argument(
+            '--max-rhodoneas', type=int, default=5,
+            help='Maximum number of rhodoneas per layer (default 5).',
+        )
+        parser.add_argument(
+            '--min-nodes-count', type=int, default=100,
+            help='Minimum number of nodes per rhodonea (default 100).',
+        )
+        parser.add_argument(
+            '--max-nodes-count', type=int, default=1000,
+            help='Maximum number of nodes per rhodonea (default 1000).',
+        )
+        parser.add_argument(
+            '--distribution', choices=DISTRIBUTIONS, default='uniform',
+            help='Layers spread all over the world or gathered around a few '
+                 'hotspots (default uniform).',
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='Seed of the random numbers, the same seed gives the same '
+                 'dataset.',
+        )
+        parser.add_argument(
+            '--processes', type=int,
+            help='Number of worker processes (default the number of CPUs).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of layers inserted at a time (default 1000).',
+        )
+        parser.add_argument(
+            '--delete', action='store_true',
+            help='Delete the current layers first.',
+        )
+
+    def log_progress(self, layers_count, rhodoneas_count):
+        self.stdout.write(self.style.WARNING(
+            f'\t{layers_count} layers, {rhodoneas_count} rhodoneas'
+        ))
+
+    def delete_layers(self):
+        # Emptying the tables at once: deleting through the ORM would collect
+        # every row and send the delete signals for each.
+        with connection.cursor() as cursor:
+            cursor.execute('TRUNCATE {rhodonea_table}, {layer_table}'.format(
+                rhodonea_table=connection.ops.quote_name(
+                    Rhodonea._meta.db_table
+                ),
+                layer_table=connection.ops.quote_name(Layer._meta.db_table),
+            ))
+
+    def handle(self, *args, **options):
+        if not 0 <= options['min_rhodoneas'] <= options['max_rhodoneas']:
+            raise CommandError('Invalid range of rhodoneas per layer.')
+        if not 0 < options['min_nodes_count'] <= options['max_nodes_count']:
+            raise CommandError('Invalid range of nodes per rhodonea.')
+
+        if options['delete']:
+            self.stdout.write(self.style.WARNING('Deleting all layers...'))
+            self.delete_layers()
+
+        self.stdout.write(self.style.WARNING(
+            f'Creating {options["layers"]} layers...'
+        ))
+
+        layers_count, rhodoneas_count = generate(
+            options['layers'],
+            rhodoneas_range=(
+                options['min_rhodoneas'], options['max_rhodoneas']
+            ),
+            nodes_range=(
+                options['min_nodes_count'], options['max_nodes_count']
+            ),
+            distribution=options['distribution'],
+            seed=options['seed'],
+            processes=options['processes'],
+            batch_size=options['batch_size'],
+            callback=self.log_progress,
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {layers_count} layers and {rhodoneas_count} rhodoneas'
+        ))
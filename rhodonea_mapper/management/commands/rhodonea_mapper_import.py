@@ -0,0 +1,68 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from rhodonea_mapper.importer import (
+    DEFAULT_BATCH_SIZE,
+    import_features,
+    iter_geojson_features,
+    iter_ndjson_features,
+)
+
+
+FEATURES_READERS = {
+    'geojson': iter_geojson_features,
+    'ndjson': iter_ndjson_features,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Import Layer objects along with their Rhodonea objects from a dump '
+        'written by rhodonea_mapper_export.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the dump to import.')
+        parser.add_argument(
+            '--format', choices=sorted(FEATURES_READERS), default='ndjson',
+            help='GeoJSON FeatureCollection or one feature per line '
+                 '(default ndjson).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Number of rhodoneas validated and inserted at a time '
+                 f'(default {DEFAULT_BATCH_SIZE}).',
+        )
+
+    def log_progress(self, layers_count, rhodoneas_count):
+        self.stdout.write(self.style.WARNING(
+            f'\t{layers_count} layers, {rhodoneas_count} rhodoneas'
+        ))
+
+    def handle(self, *args, **options):
+        read_features = FEATURES_READERS[options['format']]
+
+        self.stdout.write(self.style.WARNING(
+            f'Importing {options["path"]}...'
+        ))
+
+        try:
+            with open(options['path']) as f:
+                layers_count, rhodoneas_count = import_features(
+                    read_features(f),
+                    batch_size=options['batch_size'],
+                    callback=self.log_progress,
+                )
+        except ValidationError as e:
+            raise CommandError(
+                'Nothing was imported, invalid features found: '
+                f'{json.dumps(e.message_dict, indent=2)}'
+            )
+        except ValueError as e:
+            raise CommandError(f'Nothing was imported: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {layers_count} layers and {rhodoneas_count} rhodoneas'
+        ))
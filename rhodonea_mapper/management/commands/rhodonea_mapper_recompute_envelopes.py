@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from rhodonea_mapper.models import Layer, envelopes_in_database
+
+
+class Command(BaseCommand):
+    help = 'Recompute the envelopes of the Rhodonea and Layer objects.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of layers processed at a time (default 1000).',
+        )
+        parser.add_argument(
+            '--backend', choices=['python', 'database'],
+            default='database' if envelopes_in_database() else 'python',
+            help=(
+                'Compute the envelopes with NumPy or with PostGIS (default '
+                'RHODONEA_MAPPER_ENVELOPES_BACKEND).'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if options['backend'] == 'database':
+            compute = Layer.objects.compute_envelopes_in_database
+        else:
+            compute = Layer.objects.compute_envelopes
+
+        layers = Layer.objects.order_by('pk').values_list('pk', flat=True)
+        self.stdout.write(self.style.WARNING(
+            f'Found {layers.count()} layers to recompute'
+        ))
+
+        last_pk = 0
+        done = 0
+        while True:
+            chunk = list(layers.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+
+            compute(chunk)
+
+            last_pk = chunk[-1]
+            done += len(chunk)
+            self.stdout.write(self.style.WARNING(f'\t{done} layers'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Recomputed the envelopes of {done} layers'
+        ))
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.7 on 2026-10-18 09:12
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rhodonea',
+            name='curve',
+            field=django.contrib.gis.db.models.fields.LineStringField(blank=True, null=True, srid=4326, verbose_name='Curve'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.7 on 2026-10-18 10:05
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0002_rhodonea_curve'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rhodonea',
+            name='envelope',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, null=True, srid=4326, verbose_name='Bounding box'),
+        ),
+    ]
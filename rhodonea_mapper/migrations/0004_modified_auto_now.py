@@ -0,0 +1,23 @@
+# Generated by Django 3.0.7 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0003_rhodonea_envelope'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='layer',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='rhodonea',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.0.7 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0004_modified_auto_now'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='layer',
+            index=models.Index(
+                fields=['-created', '-id'], name='layer_created_id_idx'
+            ),
+        ),
+    ]
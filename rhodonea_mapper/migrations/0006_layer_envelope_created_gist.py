@@ -0,0 +1,23 @@
+# Generated by Django 3.0.7 on 2026-10-18 14:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0005_layer_created_id_idx'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.AddIndex(
+            model_name='layer',
+            index=django.contrib.postgres.indexes.GistIndex(
+                fields=['envelope', 'created'],
+                name='layer_envelope_created_gist',
+            ),
+        ),
+    ]
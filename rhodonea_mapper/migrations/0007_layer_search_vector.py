@@ -0,0 +1,135 @@
+# Generated by Django 3.0.7 on 2026-10-18 16:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# The search vector of a layer is computed when the layer is inserted, when
+# its title or its notes change and when the vector is reset to NULL, which
+# the rhodoneas deleted or renamed do once per statement. The names of the
+# rhodoneas inserted are appended to the vectors of their layers instead.
+# Django never writes the vector back, `LayerManager` defers it.
+SEARCH_VECTOR_SQL = '''
+CREATE FUNCTION rhodonea_mapper_layer_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.notes, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce((
+            SELECT string_agg(name, ' ' ORDER BY id)
+            FROM rhodonea_mapper_rhodonea
+            WHERE layer_id = NEW.id
+        ), '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER rhodonea_mapper_layer_search_vector_insert
+BEFORE INSERT ON rhodonea_mapper_layer
+FOR EACH ROW EXECUTE PROCEDURE rhodonea_mapper_layer_search_vector();
+
+CREATE TRIGGER rhodonea_mapper_layer_search_vector_update
+BEFORE UPDATE OF title, notes, search_vector ON rhodonea_mapper_layer
+FOR EACH ROW WHEN (
+    NEW.search_vector IS NULL OR
+    OLD.title IS DISTINCT FROM NEW.title OR
+    OLD.notes IS DISTINCT FROM NEW.notes
+)
+EXECUTE PROCEDURE rhodonea_mapper_layer_search_vector();
+
+CREATE FUNCTION rhodonea_mapper_rhodonea_search_vector() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        -- A NULL vector stays NULL, hence is computed from scratch
+        UPDATE rhodonea_mapper_layer AS layer
+        SET search_vector = layer.search_vector || setweight(
+            to_tsvector('simple', inserted.names), 'C'
+        )
+        FROM (
+            SELECT layer_id, string_agg(name, ' ' ORDER BY id) AS names
+            FROM new_rhodoneas
+            GROUP BY layer_id
+        ) AS inserted
+        WHERE layer.id = inserted.layer_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE rhodonea_mapper_layer SET search_vector = NULL
+        WHERE id IN (SELECT layer_id FROM old_rhodoneas);
+    ELSE
+        UPDATE rhodonea_mapper_layer SET search_vector = NULL
+        WHERE id IN (
+            SELECT unnest(ARRAY[o.layer_id, n.layer_id])
+            FROM old_rhodoneas o JOIN new_rhodoneas n ON n.id = o.id
+            WHERE n.name IS DISTINCT FROM o.name OR n.layer_id <> o.layer_id
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER rhodonea_mapper_rhodonea_search_vector_insert
+AFTER INSERT ON rhodonea_mapper_rhodonea
+REFERENCING NEW TABLE AS new_rhodoneas
+FOR EACH STATEMENT EXECUTE PROCEDURE rhodonea_mapper_rhodonea_search_vector();
+
+CREATE TRIGGER rhodonea_mapper_rhodonea_search_vector_update
+AFTER UPDATE ON rhodonea_mapper_rhodonea
+REFERENCING OLD TABLE AS old_rhodoneas NEW TABLE AS new_rhodoneas
+FOR EACH STATEMENT EXECUTE PROCEDURE rhodonea_mapper_rhodonea_search_vector();
+
+CREATE TRIGGER rhodonea_mapper_rhodonea_search_vector_delete
+AFTER DELETE ON rhodonea_mapper_rhodonea
+REFERENCING OLD TABLE AS old_rhodoneas
+FOR EACH STATEMENT EXECUTE PROCEDURE rhodonea_mapper_rhodonea_search_vector();
+
+UPDATE rhodonea_mapper_layer SET search_vector = NULL;
+'''
+
+DROP_SEARCH_VECTOR_SQL = '''
+DROP TRIGGER rhodonea_mapper_rhodonea_search_vector_delete
+ON rhodonea_mapper_rhodonea;
+DROP TRIGGER rhodonea_mapper_rhodonea_search_vector_update
+ON rhodonea_mapper_rhodonea;
+DROP TRIGGER rhodonea_mapper_rhodonea_search_vector_insert
+ON rhodonea_mapper_rhodonea;
+DROP FUNCTION rhodonea_mapper_rhodonea_search_vector();
+DROP TRIGGER rhodonea_mapper_layer_search_vector_update
+ON rhodonea_mapper_layer;
+DROP TRIGGER rhodonea_mapper_layer_search_vector_insert
+ON rhodonea_mapper_layer;
+DROP FUNCTION rhodonea_mapper_layer_search_vector();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0006_layer_envelope_created_gist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='layer',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True, editable=False, null=True
+            ),
+        ),
+        TrigramExtension(),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, DROP_SEARCH_VECTOR_SQL),
+        migrations.AddIndex(
+            model_name='layer',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='layer_search_vector_gin'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='layer',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['title'],
+                name='layer_title_trgm_gin',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ),
+    ]
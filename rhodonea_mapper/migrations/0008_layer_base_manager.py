@@ -0,0 +1,21 @@
+# Generated by Django 3.0.7 on 2026-10-18 18:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0007_layer_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='layer',
+            options={
+                'base_manager_name': 'objects',
+                'verbose_name': 'Layer',
+                'verbose_name_plural': 'Layers',
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.0.7 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0008_layer_base_manager'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='layer',
+            name='overlays_count',
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name='Overlays counter'
+            ),
+        ),
+    ]
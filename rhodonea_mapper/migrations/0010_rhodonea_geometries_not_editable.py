@@ -0,0 +1,30 @@
+# Generated by Django 3.0.7 on 2026-10-18 19:20
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rhodonea_mapper', '0009_layer_overlays_count_not_editable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rhodonea',
+            name='curve',
+            field=django.contrib.gis.db.models.fields.LineStringField(
+                blank=True, editable=False, null=True, srid=4326,
+                verbose_name='Curve'
+            ),
+        ),
+        migrations.AlterField(
+            model_name='rhodonea',
+            name='envelope',
+            field=django.contrib.gis.db.models.fields.PolygonField(
+                blank=True, editable=False, null=True, srid=4326,
+                verbose_name='Bounding box'
+            ),
+        ),
+    ]
@@ -1,15 +1,29 @@
+import numpy as np
+from django.conf import settings
 from django.contrib.gis.db import models
-from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.contrib.gis.geos import Polygon
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, transaction
+from django.db.models import Count, F, FloatField, Func, Max, Min, Q
 from django.utils import timezone
-from pyproj import Geod
 
-
-WGS84_GEOD = Geod(ellps='WGS84')
+from rhodonea_mapper.geometry import (
+    WGS84_GEOD,
+    build_curve,
+    build_curves,
+    covers_envelope,
+    envelopes_extents,
+    to_wgs84,
+    touches_envelope_boundary,
+    union_envelopes,
+)
+from rhodonea_mapper.instrumentation import instrumented
 
 
 class TimeStampedModelGis(models.Model):
     created = models.DateTimeField(blank=True, null=True)
-    modified = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
 
     def save(self, **kwargs):
         if not self.created:
@@ -20,6 +34,258 @@ class TimeStampedModelGis(models.Model):
         abstract = True
 
 
+def extent_aggregates(field):
+    '''
+    Aggregates computing the exact extent of a geometry field (ST_Extent would
+    round it to the precision of the cached float boxes).
+    '''
+    return {
+        key: aggregate(Func(field, function=func, output_field=FloatField()))
+        for key, aggregate, func in [
+            ('xmin', Min, 'ST_XMin'),
+            ('ymin', Min, 'ST_YMin'),
+            ('xmax', Max, 'ST_XMax'),
+            ('ymax', Max, 'ST_YMax'),
+        ]
+    }
+
+
+# Sets the envelopes of the rhodoneas selected from their centres and radii,
+# writing only the ones that changed, then the ones of the layers given. Both
+# tables are read from the same snapshot, hence the extents of the layers are
+# aggregated from the rows the first update returns along with the stored
+# envelopes of the other rhodoneas. The azimuths of ST_Project are in radians:
+# west, south, east, north.
+ENVELOPES_SQL = '''
+WITH boxes AS (
+    SELECT
+        rh.id,
+        ST_MakeEnvelope(
+            ST_X(ST_Project(rh.point::geography, rh.r, 1.5 * pi())::geometry),
+            ST_Y(ST_Project(rh.point::geography, rh.r, pi())::geometry),
+            ST_X(ST_Project(rh.point::geography, rh.r, 0.5 * pi())::geometry),
+            ST_Y(ST_Project(rh.point::geography, rh.r, 0)::geometry),
+            4326
+        ) AS envelope
+    FROM {rhodonea_table} AS rh
+    WHERE {rhodoneas_filter}
+), rhodoneas AS (
+    UPDATE {rhodonea_table} AS rh
+    SET envelope = boxes.envelope
+    FROM boxes
+    WHERE rh.id = boxes.id AND rh.envelope IS DISTINCT FROM boxes.envelope
+    RETURNING rh.id, rh.layer_id, rh.envelope
+), envelopes AS (
+    SELECT layer_id, envelope FROM rhodoneas
+    UNION ALL
+    SELECT layer_id, envelope FROM {rhodonea_table}
+    WHERE layer_id = ANY(%(layers)s) AND id NOT IN (SELECT id FROM rhodoneas)
+), extents AS (
+    SELECT
+        layer_id,
+        ST_MakeEnvelope(
+            min(ST_XMin(envelope)), min(ST_YMin(envelope)),
+            max(ST_XMax(envelope)), max(ST_YMax(envelope)),
+            4326
+        ) AS envelope
+    FROM envelopes
+    GROUP BY layer_id
+), layers AS (
+    SELECT layer.id, extents.envelope
+    FROM {layer_table} AS layer
+    LEFT JOIN extents ON extents.layer_id = layer.id
+    WHERE layer.id = ANY(%(layers)s)
+)
+UPDATE {layer_table} AS layer
+SET
+    envelope = layers.envelope,
+    modified = CASE
+        WHEN layer.envelope IS DISTINCT FROM layers.envelope
+        THEN %(now)s ELSE layer.modified
+    END
+FROM layers
+WHERE layer.id = layers.id
+'''
+
+
+def envelopes_in_database():
+    '''
+    Whether the envelopes are computed by PostGIS rather than in Python, see
+    `LayerManager.compute_envelopes_in_database`.
+    '''
+    return getattr(
+        settings, 'RHODONEA_MAPPER_ENVELOPES_BACKEND', 'python'
+    ) == 'database'
+
+
+def fill_geometries(rhodoneas):
+    '''
+    Sets curve and envelope of the rhodoneas missing them, the curves and the
+    envelopes being computed all at once.
+    '''
+    missing = [rh for rh in rhodoneas if rh.curve is None]
+    for rh, curve in zip(missing, build_curves(missing)):
+        rh.curve = curve
+
+    fill_envelopes(rhodoneas)
+
+
+def fill_envelopes(rhodoneas):
+    '''
+    Sets the envelope of the rhodoneas missing it, the envelopes being
+    computed all at once.
+    '''
+    missing = [rh for rh in rhodoneas if rh.envelope is None]
+    points = [to_wgs84(rh.point) for rh in missing]
+    extents = envelopes_extents(
+        [p.x for p in points], [p.y for p in points], [rh.r for rh in missing]
+    )
+    for rh, extent in zip(missing, extents):
+        rh.envelope = Polygon.from_bbox(extent).envelope
+
+
+class LayerManager(models.Manager):
+    def get_queryset(self):
+        # The search vector is only ever used in filters. Being deferred, it
+        # is neither loaded nor written back by save(), which would undo the
+        # changes the rhodoneas made since the layer was loaded.
+        return super().get_queryset().defer('search_vector')
+
+    def create_with_rhodoneas(self, rhodoneas_data, **kwargs):
+        '''
+        Creates a layer along with its rhodoneas within a single transaction.
+        The rhodoneas are bulk inserted, hence no per-row signal is sent, and
+        the envelope is computed once and saved with the layer.
+        '''
+        rhodoneas = [Rhodonea(**rh_data) for rh_data in rhodoneas_data]
+        fill_geometries(rhodoneas)
+
+        with transaction.atomic():
+            layer = self.model(**kwargs)
+            layer.envelope = union_envelopes(rh.envelope for rh in rhodoneas)
+            layer.save(force_insert=True, using=self.db)
+
+            for rh in rhodoneas:
+                rh.layer = layer
+            Rhodonea.objects.using(self.db).bulk_create(rhodoneas)
+
+        return layer
+
+    def add_overlays(self, counts):
+        '''
+        Increments atomically the overlays counters of the layers given as a
+        mapping {layer id: increment}, one UPDATE per distinct increment.
+        '''
+        ids_by_count = {}
+        for layer_id, count in counts.items():
+            ids_by_count.setdefault(count, []).append(layer_id)
+
+        # A single UPDATE is atomic on its own
+        with transaction.atomic(
+            using=self.db, savepoint=len(ids_by_count) > 1
+        ):
+            for count, ids in ids_by_count.items():
+                self.filter(pk__in=ids).update(
+                    overlays_count=F('overlays_count') + count
+                )
+
+    def compute_envelopes_in_database(self, layer_ids, rhodonea_ids=None):
+        '''
+        Computes the envelopes of the rhodoneas given, all the ones of the
+        layers given by default, and the ones of the layers in one statement
+        run by PostGIS, geodesics being solved by ST_Project. The layers whose
+        envelope changed are marked as modified. Returns the number of layers
+        updated.
+        '''
+        if rhodonea_ids is None:
+            rhodoneas_filter = 'rh.layer_id = ANY(%(layers)s)'
+        else:
+            rhodoneas_filter = 'rh.id = ANY(%(rhodoneas)s)'
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(ENVELOPES_SQL.format(
+                rhodonea_table=Rhodonea._meta.db_table,
+                layer_table=self.model._meta.db_table,
+                rhodoneas_filter=rhodoneas_filter,
+            ), {
+                'layers': list(layer_ids),
+                'rhodoneas': list(rhodonea_ids or []),
+                'now': timezone.now(),
+            })
+            return cursor.rowcount
+
+    def compute_envelopes(self, layer_ids):
+        '''
+        Computes the envelopes of all the rhodoneas of the layers given and
+        the ones of the layers with a single batch of geodesics, then writes
+        the ones changed with one UPDATE per model. The layers whose envelope
+        changed are marked as modified. Returns their number.
+        '''
+        rows = list(
+            Rhodonea.objects.using(self.db)
+            .filter(layer_id__in=layer_ids)
+            .order_by('layer_id')
+            .values_list(
+                'pk',
+                'layer_id',
+                Func('point', function='ST_X', output_field=FloatField()),
+                Func('point', function='ST_Y', output_field=FloatField()),
+                'r',
+                'envelope',
+            )
+        )
+        layers = dict(
+            self.filter(pk__in=layer_ids).values_list('pk', 'envelope')
+        )
+
+        pks, rh_layers, lngs, lats, radii, envelopes = (
+            zip(*rows) if rows else ([],) * 6
+        )
+        extents = envelopes_extents(lngs, lats, radii)
+
+        rhodoneas = []
+        for pk, extent, envelope in zip(pks, extents, envelopes):
+            if envelope is None or envelope.extent != tuple(extent):
+                rhodoneas.append(Rhodonea(
+                    pk=pk, envelope=Polygon.from_bbox(extent).envelope
+                ))
+
+        # The rows are sorted by layer: reduce the extents of each run
+        extents_by_layer = {}
+        if rows:
+            ids, starts = np.unique(rh_layers, return_index=True)
+            for layer_id, mins, maxs in zip(
+                ids.tolist(),
+                np.minimum.reduceat(extents[:, :2], starts),
+                np.maximum.reduceat(extents[:, 2:], starts),
+            ):
+                extents_by_layer[layer_id] = (*mins, *maxs)
+
+        now = timezone.now()
+        changed = []
+        for pk, envelope in layers.items():
+            extent = extents_by_layer.get(pk)
+            if (envelope and envelope.extent) != extent:
+                changed.append(Layer(
+                    pk=pk,
+                    envelope=extent and Polygon.from_bbox(extent).envelope,
+                    modified=now,
+                ))
+
+        if not rhodoneas and not changed:
+            return 0
+
+        with transaction.atomic(using=self.db):
+            if rhodoneas:
+                Rhodonea.objects.using(self.db).bulk_update(
+                    rhodoneas, ['envelope']
+                )
+            if changed:
+                self.bulk_update(changed, ['envelope', 'modified'])
+
+        return len(changed)
+
+
 class Layer(TimeStampedModelGis):
     '''
     Model representing a set of Rhodonea objects hence a specific set of
@@ -27,23 +293,147 @@ class Layer(TimeStampedModelGis):
     '''
     title = models.CharField('Name', max_length=1000)
     envelope = models.PolygonField('Bounding box', blank=True, null=True)
-    overlays_count = models.IntegerField('Overlays counter', default=0)
+    # Only ever incremented in the database, see `add_overlays`
+    overlays_count = models.IntegerField(
+        'Overlays counter', default=0, editable=False
+    )
     notes = models.TextField('Notes', blank=True, null=True)
+    # Maintained by triggers over title, notes and the names of the
+    # rhodoneas, see the migration 0007_layer_search_vector.
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    objects = LayerManager()
 
     class Meta:
         verbose_name = 'Layer'
         verbose_name_plural = 'Layers'
+        # The layers of the rhodoneas are fetched without the search vector
+        base_manager_name = 'objects'
+        indexes = [
+            # Supports the ordering of the layers and the keyset pagination
+            models.Index(
+                fields=['-created', '-id'], name='layer_created_id_idx'
+            ),
+            # Supports the in_bbox filter narrowed by creation time, mixing a
+            # scalar column into a GiST index requires btree_gist.
+            GistIndex(
+                fields=['envelope', 'created'],
+                name='layer_envelope_created_gist',
+            ),
+            # Support the search filter: full-text and similar titles
+            GinIndex(
+                fields=['search_vector'], name='layer_search_vector_gin'
+            ),
+            GinIndex(
+                fields=['title'],
+                name='layer_title_trgm_gin',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ]
+
+    def save(self, **kwargs):
+        # Writing back the overlays count loaded would undo the increments
+        # made since, updates leave it out (as well as the deferred fields,
+        # as Django does).
+        if not self._state.adding and not kwargs.get('force_insert') and (
+            kwargs.get('update_fields') is None
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'overlays_count' and
+                f.attname not in deferred
+            ]
+        super().save(**kwargs)
 
+    @instrumented('set_envelope')
     def set_envelope(self):
-        m_p = MultiPolygon(
-            *[r.build_envelope() for r in self.rhodoneas.all()]
+        if envelopes_in_database():
+            Layer.objects.compute_envelopes_in_database([self.pk])
+            self.refresh_from_db(fields=['envelope', 'modified'])
+            return
+
+        extent = self.rhodoneas.aggregate(
+            **extent_aggregates('envelope'),
+            missing=Count('pk', filter=Q(envelope__isnull=True)),
         )
-        self.envelope = m_p.envelope
-        self.save()
+        self.envelope = None
+        if extent['xmin'] is not None:
+            self.envelope = Polygon.from_bbox((
+                extent['xmin'], extent['ymin'],
+                extent['xmax'], extent['ymax'],
+            )).envelope
+
+        if extent['missing']:
+            # Rhodoneas stored before their envelopes were: fill them in
+            # rather than leaving them out of the one of the layer.
+            missing = list(self.rhodoneas.filter(
+                envelope__isnull=True
+            ).only('pk', 'point', 'r'))
+            fill_envelopes(missing)
+            Rhodonea.objects.bulk_update(missing, ['envelope'])
+            self.envelope = union_envelopes(
+                [self.envelope] + [rh.envelope for rh in missing]
+            )
+
+        self.save(update_fields=['envelope', 'modified'])
+
+    def update_envelope(self, old=None, new=None):
+        '''
+        Keeps the envelope up to date after one of the rhodoneas had its own
+        changed from `old` to `new`, either being None when the rhodonea has
+        just been created or deleted respectively. The envelope is computed
+        from scratch only when the old one of the rhodonea reached its
+        boundary, otherwise it is at most extended.
+        '''
+        if old is not None and (
+            self.envelope is None or
+            touches_envelope_boundary(self.envelope, old)
+        ):
+            self.set_envelope()
+        elif new is not None and (
+            self.envelope is None or
+            not covers_envelope(self.envelope, new)
+        ):
+            self.envelope = union_envelopes([self.envelope, new])
+            self.save(update_fields=['envelope', 'modified'])
 
     def add_overlay(self):
-        self.overlays_count += 1
-        self.save()
+        # Not going through save() leaves `modified`, hence the cached
+        # representations of the layer, untouched.
+        Layer.objects.add_overlays({self.pk: 1})
+
+    def touch(self):
+        '''
+        Marks the layer as modified, e.g. after one of its rhodoneas changed.
+        '''
+        self.modified = timezone.now()
+        Layer.objects.filter(pk=self.pk).update(modified=self.modified)
+
+    def build_curves(self):
+        return build_curves(self.rhodoneas.all())
+
+
+class RhodoneaQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        '''
+        Fills in what `Rhodonea.save` would before inserting the objects: the
+        creation time, the curves and the envelopes.
+        '''
+        objs = list(objs)
+        now = timezone.now()
+        for rh in objs:
+            if not rh.created:
+                rh.created = now
+
+        fill_geometries(objs)
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+
+        for rh in objs:
+            rh._curve_state = rh.get_curve_state()
+            rh._loaded_layer_id = rh.layer_id
+        return objs
 
 
 class Rhodonea(TimeStampedModelGis):
@@ -65,18 +455,90 @@ class Rhodonea(TimeStampedModelGis):
         'Stroke color', max_length=10, default='#000000'
     )
     stroke_weight = models.IntegerField('Stroke weight', default=1)
+    # Both derived from the fields above on save
+    curve = models.LineStringField(
+        'Curve', blank=True, null=True, editable=False
+    )
+    envelope = models.PolygonField(
+        'Bounding box', blank=True, null=True, editable=False
+    )
+
+    CURVE_FIELDS = ['point', 'r', 'n', 'd', 'rotation', 'nodes_count']
+
+    _curve_state = None
+    _envelope_change = None
+    # Layer the rhodonea was loaded from and, once saved, the previous layer
+    # and envelope when it was moved to another one.
+    _loaded_layer_id = None
+    _layer_change = None
+
+    objects = RhodoneaQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Rhodonea'
         verbose_name_plural = 'Rhodoneas'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        deferred = instance.get_deferred_fields()
+        if not deferred.intersection(cls.CURVE_FIELDS):
+            instance._curve_state = instance.get_curve_state()
+        if 'layer_id' not in deferred:
+            instance._loaded_layer_id = instance.layer_id
+        return instance
+
+    def get_curve_state(self):
+        '''
+        Returns the values of the fields the curve depends on, so that a
+        change can be detected before saving. The point is reduced to its
+        coordinates and SRID, cheaper than serializing it.
+        '''
+        return tuple(
+            self.get_point_state() if f == 'point' else getattr(self, f)
+            for f in self.CURVE_FIELDS
+        )
+
+    def get_point_state(self):
+        if self.point is None:
+            return None
+        return self.point.coords, self.point.srid
+
+    def save(self, **kwargs):
+        self._envelope_change = None
+        self._layer_change = None
+        if self._loaded_layer_id not in (None, self.layer_id):
+            self._layer_change = (self._loaded_layer_id, self.envelope)
+
+        curve_state = self.get_curve_state()
+        if (
+            self.curve is None or self.envelope is None or
+            curve_state != self._curve_state
+        ):
+            previous_envelope = self.envelope
+            self.curve = self.build_curve()
+            # Otherwise it is computed along with the one of the layer once
+            # saved, see the signals.
+            if not envelopes_in_database():
+                self.envelope = self.build_envelope()
+            self._envelope_change = (previous_envelope, self.envelope)
+
+        super().save(**kwargs)
+        self._curve_state = curve_state
+        self._loaded_layer_id = self.layer_id
+
+    @instrumented('build_envelope')
     def build_envelope(self):
+        point = to_wgs84(self.point)
         return Polygon.from_bbox((
-            WGS84_GEOD.fwd(*self.point, -90, self.r)[0],
-            WGS84_GEOD.fwd(*self.point, 180, self.r)[1],
-            WGS84_GEOD.fwd(*self.point, 90, self.r)[0],
-            WGS84_GEOD.fwd(*self.point, 0, self.r)[1],
+            WGS84_GEOD.fwd(*point, -90, self.r)[0],
+            WGS84_GEOD.fwd(*point, 180, self.r)[1],
+            WGS84_GEOD.fwd(*point, 90, self.r)[0],
+            WGS84_GEOD.fwd(*point, 0, self.r)[1],
         )).envelope
 
+    def build_curve(self):
+        return build_curve(self)
+
     def __str__(self):
         return self.name
@@ -1,9 +1,116 @@
-from django.db.models.signals import post_save
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
-from rhodonea_mapper.models import Rhodonea
+from rhodonea_mapper.models import Layer, Rhodonea, envelopes_in_database
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def defer_envelope_updates():
+    '''
+    Within this context saving a rhodonea does not update the envelope of its
+    layer straight away: each layer involved gets its envelope set once, when
+    the outermost context exits.
+    '''
+    if getattr(_deferred, 'layers', None) is not None:
+        yield
+        return
+
+    _deferred.layers = {}
+    try:
+        yield
+        layers = _deferred.layers
+    finally:
+        _deferred.layers = None
+
+    for layer in layers.values():
+        layer.set_envelope()
+
+
+def get_deleting_layers():
+    if not hasattr(_deferred, 'deleting'):
+        _deferred.deleting = set()
+    return _deferred.deleting
+
+
+def get_previous_layer(rhodonea):
+    '''
+    Returns the layer the rhodonea was moved from by its last save, None if
+    it was not moved or the layer is gone.
+    '''
+    if rhodonea._layer_change is None:
+        return None
+    return Layer.objects.filter(pk=rhodonea._layer_change[0]).first()
 
 
 @receiver(post_save, sender=Rhodonea)
 def set_layer_bbox_after_rhodonea_save(sender, instance, **kwargs):
-    instance.layer.set_envelope()
+    previous_layer = get_previous_layer(instance)
+
+    layers = getattr(_deferred, 'layers', None)
+    if layers is not None:
+        layers[instance.layer_id] = instance.layer
+        if previous_layer is not None:
+            layers.setdefault(previous_layer.pk, previous_layer)
+        return
+
+    if envelopes_in_database():
+        if instance._layer_change is not None or (
+            instance._envelope_change is not None
+        ):
+            # Only the envelope of this rhodonea is computed, the extents of
+            # the layers are aggregated from the ones stored for the others.
+            layer_ids = [instance.layer_id]
+            if previous_layer is not None:
+                layer_ids.append(previous_layer.pk)
+            Layer.objects.compute_envelopes_in_database(
+                layer_ids, rhodonea_ids=[instance.pk]
+            )
+            instance.refresh_from_db(fields=['envelope'])
+            instance.layer.refresh_from_db(fields=['envelope'])
+        if previous_layer is not None:
+            previous_layer.touch()
+        instance.layer.touch()
+        return
+
+    if previous_layer is not None:
+        # The rhodonea left the previous layer and joined the new one
+        previous_layer.update_envelope(old=instance._layer_change[1])
+        previous_layer.touch()
+
+    if instance._layer_change is not None:
+        instance.layer.update_envelope(new=instance.envelope)
+    elif instance._envelope_change is not None:
+        instance.layer.update_envelope(*instance._envelope_change)
+    instance.layer.touch()
+
+
+@receiver(post_delete, sender=Rhodonea)
+def set_layer_bbox_after_rhodonea_delete(sender, instance, **kwargs):
+    if instance.layer_id in get_deleting_layers():
+        return
+
+    layers = getattr(_deferred, 'layers', None)
+    if layers is not None:
+        layers[instance.layer_id] = instance.layer
+        return
+
+    instance.layer.update_envelope(old=instance.envelope)
+    instance.layer.touch()
+
+
+@receiver(pre_delete, sender=Layer)
+def mark_layer_deleting(sender, instance, **kwargs):
+    # The rhodoneas are deleted along with the layer, there is no point in
+    # keeping its envelope up to date meanwhile.
+    get_deleting_layers().add(instance.pk)
+
+
+@receiver(post_delete, sender=Layer)
+def unmark_layer_deleting(sender, instance, **kwargs):
+    get_deleting_layers().discard(instance.pk)
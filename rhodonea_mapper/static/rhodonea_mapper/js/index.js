@@ -46,6 +46,91 @@ class ApiClient {
     let response = await this.fetch(method, path, query, data);
     return await response.json();
   }
+
+  async fetchLayers(path, query = {}) {
+    // Fetch the details of layers in the columnar binary format
+    let response = await this.fetch(
+      "GET", path, Object.assign({format: "columnar"}, query)
+    );
+    return decodeColumnarLayers(await response.arrayBuffer());
+  }
+}
+
+
+const COLUMNAR_MAGIC = "RHMC";
+const COLUMNAR_CURVE_SCALE = 1e7;
+const COLUMNAR_TYPES = {Float64Array, Int32Array, Uint32Array};
+
+function decodeColumnarLayers(buffer) {
+  /*
+  Returns the layers encoded in the columnar format (see
+  rhodonea_mapper/api/renderers.py) as represented in JSON. The columns are
+  viewed by typed arrays, no copy of them is made.
+  */
+  let view = new DataView(buffer);
+  let magic = String.fromCharCode(
+    ...new Uint8Array(buffer, 0, 4)
+  );
+  if (magic !== COLUMNAR_MAGIC || view.getUint32(4, true) !== 1) {
+    throw new Error("Unsupported columnar payload");
+  }
+
+  let headerSize = view.getUint32(8, true);
+  let start = 16 + headerSize;
+  let header = JSON.parse(
+    new TextDecoder().decode(new Uint8Array(buffer, 16, headerSize))
+  );
+
+  let columns = {};
+  for (let column of header.columns) {
+    columns[column.name] = new COLUMNAR_TYPES[column.type](
+      buffer, start + column.offset, column.length
+    );
+  }
+
+  let rhodoneas = [];
+  let curveOffset = 0;
+  for (let i = 0; i < columns.lng.length; i++) {
+    let rh = {};
+    for (let [field, values] of Object.entries(header.fields)) {
+      rh[field] = values[i];
+    }
+    for (let field of ["r", "rotation", "n", "d", "nodes_count",
+                       "stroke_weight"]) {
+      rh[field] = columns[field][i];
+    }
+    rh.point = {
+      type: "Point",
+      coordinates: [columns.lng[i], columns.lat[i]],
+    };
+
+    // Delta encoded coordinates, the first ones being absolute
+    let size = columns.curve_sizes[i];
+    rh.curve = null;
+    if (size) {
+      let coordinates = [];
+      let x = 0;
+      let y = 0;
+      for (let j = 0; j < size; j++) {
+        x += columns.curves[curveOffset + 2 * j];
+        y += columns.curves[curveOffset + 2 * j + 1];
+        coordinates.push(
+          [x / COLUMNAR_CURVE_SCALE, y / COLUMNAR_CURVE_SCALE]
+        );
+      }
+      rh.curve = {type: "LineString", coordinates: coordinates};
+      curveOffset += 2 * size;
+    }
+
+    rhodoneas.push(rh);
+  }
+
+  let first = 0;
+  return header.layers.map((layer) => {
+    layer.rhodoneas = rhodoneas.slice(first, first + layer.rhodoneas_count);
+    first += layer.rhodoneas_count;
+    return layer;
+  });
 }
 
 
@@ -732,7 +817,8 @@ class Timeline {
     this.filters = {
       search: "",
       in_bbox: "",
-      offset: 0,
+      pagination: "cursor",
+      cursor: "",
       limit: 10,
     };
 
@@ -740,7 +826,7 @@ class Timeline {
   }
 
   get isFirstChunk() {
-    return this.filters.offset === 0;
+    return !this.filters.cursor;
   }
 
   setUpUI() {
@@ -749,8 +835,8 @@ class Timeline {
     this.node.find("#more a").click(function () {
       let nextUrl = $(this).attr("next");
       if (nextUrl) {
-        let query = new URLSearchParams(nextUrl);
-        me.filters['offset'] = query.get('offset');
+        let query = new URL(nextUrl, window.location.href).searchParams;
+        me.filters['cursor'] = query.get('cursor');
         me.filters['limit'] = query.get('limit');
         me.refresh();
       }
@@ -775,7 +861,7 @@ class Timeline {
   }
 
   updateInBboxFilter() {
-    this.filters.offset = 0;
+    this.filters.cursor = "";
     this.filters.in_bbox = this.rhodoneaMapper.getMapBoundsString();
   }
 
@@ -989,6 +1075,7 @@ class RhodoneaMapper {
     this.setUpUI();
 
     this.geolocateUser();
+    this.openSharedLayers();
 
     $(".hidden").removeClass("hidden");
 
@@ -1154,21 +1241,41 @@ class RhodoneaMapper {
     return shape;
   };
 
+  decodePolyline(encoded) {
+    // Curves sent as Google encoded polylines (curve_format=polyline)
+    let path = google.maps.geometry.encoding.decodePath(encoded);
+    return {
+      "type": "LineString",
+      "coordinates": path.map((p) => [p.lng(), p.lat()]),
+    };
+  }
+
+  addLayerData(layerName, out) {
+    let layer = this.layersManager.addLayer(layerName);
+
+    for (let args of out.rhodoneas) {
+      args.lng = args.point.coordinates[0];
+      args.lat = args.point.coordinates[1];
+      args.strokeColor = args.stroke_color;
+      args.strokeWeight = args.stroke_weight;
+
+      let curve = args.curve;
+      if (typeof curve === "string") {
+        curve = this.decodePolyline(curve);
+      }
+
+      layer.addGeometry(curve || this.buildRhodonea(args), args);
+    }
+
+    return layer;
+  }
+
   buildLayer(layerName, layerId, callback) {
     this.loader.start();
 
-    this.api.fetchJson("GET", `layers/${layerId}/`)
+    this.api.fetchLayers(`layers/${layerId}/`)
       .then((out) => {
-        let layer = this.layersManager.addLayer(layerName);
-
-        for (let args of out.rhodoneas) {
-          args.lng = args.point.coordinates[0];
-          args.lat = args.point.coordinates[1];
-          args.strokeColor = args.stroke_color;
-          args.strokeWeight = args.stroke_weight;
-
-          layer.addGeometry(this.buildRhodonea(args), args);
-        }
+        let layer = this.addLayerData(layerName, out[0]);
 
         if (callback) {
           callback(layer);
@@ -1183,6 +1290,41 @@ class RhodoneaMapper {
         this.loader.stop();
       });
   }
+
+  buildLayers(layerIds, callback) {
+    /*
+    Fetches many layers with a single request, e.g. to open a shared
+    collection of layers.
+    */
+    this.loader.start();
+
+    this.api.fetchLayers("layers/batch/", {ids: layerIds.join(",")})
+      .then((out) => {
+        let layers = out.map(
+          (x) => this.addLayerData(`Layer__${x.id}`, x)
+        );
+
+        if (callback) {
+          callback(layers);
+        }
+      })
+      .catch((response) => {
+        if (callback) {
+          callback([]);
+        }
+      })
+      .finally(() => {
+        this.loader.stop();
+      });
+  }
+
+  openSharedLayers() {
+    // e.g. /rhodonea_mapper/?layers=1,2,3
+    let ids = new URL(window.location.href).searchParams.get("layers");
+    if (ids) {
+      this.buildLayers(ids.split(","));
+    }
+  }
 }
 
 
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+import argparse
+import os
+import sys
+
+import django
+from django.conf import settings
+from django.test.utils import get_runner
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the benchmarks.')
+    parser.add_argument(
+        'names', nargs='*',
+        help='Prefixes of the names of the benchmarks to run (default all).',
+    )
+    parser.add_argument(
+        '--output', help='Path of the JSON file to save the results to.',
+    )
+    parser.add_argument(
+        '--compare',
+        help='Path of the JSON file of previous results to compare with, '
+             'exits with an error status on regressions.',
+    )
+    args = parser.parse_args()
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'tests.test_settings'
+    django.setup()
+
+    from benchmarks import compare, run, save
+
+    TestRunner = get_runner(settings)
+    test_runner = TestRunner(verbosity=1)
+    old_config = test_runner.setup_databases()
+    try:
+        results = run(args.names)
+    finally:
+        test_runner.teardown_databases(old_config)
+
+    if args.output:
+        save(results, args.output)
+    if args.compare:
+        sys.exit(bool(compare(args.compare, results)))
@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.reverse import reverse
+
+from rhodonea_mapper.api import clusters
+
+from tests.rhodonea_mapper.api.tests_tiles import get_tile
+from tests.rhodonea_mapper.factories import (
+    LayerFactory,
+    get_centered_envelope,
+)
+
+
+class ClustersViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for point in [Point(10, 45), Point(11, 45.5), Point(-120, -45)]:
+            LayerFactory(
+                envelope=get_centered_envelope(point=point, radius=1)
+            )
+
+    def get_features(self, z, x, y):
+        response = self.client.get(reverse('clusters', args=[z, x, y]))
+        self.assertEqual(200, response.status_code)
+        self.assertIn('public', response['cache-control'])
+        self.assertEqual('FeatureCollection', response.json()['type'])
+        return response.json()['features']
+
+    def test(self):
+        features = self.get_features(0, 0, 0)
+        self.assertEqual(2, len(features))
+
+        self.assertEqual(2, features[0]['properties']['count'])
+        self.assertEqual([9, 44, 12, 46.5], features[0]['bbox'])
+        lng, lat = features[0]['geometry']['coordinates']
+        self.assertAlmostEqual(10.5, lng, places=6)
+        self.assertTrue(45 < lat < 45.5)
+
+        self.assertEqual(1, features[1]['properties']['count'])
+        self.assertEqual([-121, -46, -119, -44], features[1]['bbox'])
+        lng, lat = features[1]['geometry']['coordinates']
+        self.assertAlmostEqual(-120, lng, places=6)
+        self.assertAlmostEqual(-45, lat, places=6)
+
+    def test_zoom(self):
+        features = self.get_features(*get_tile(10, 45, 3))
+        self.assertEqual(
+            [2], [f['properties']['count'] for f in features]
+        )
+
+        # The cells get smaller than the distance between the layers
+        features = self.get_features(*get_tile(10, 45, 4))
+        self.assertEqual(
+            [1, 1], [f['properties']['count'] for f in features]
+        )
+
+    def test_tiles(self):
+        # Each layer is counted in the tile its centre falls in only
+        self.assertEqual(
+            [2], [f['properties']['count'] for f in self.get_features(1, 1, 0)]
+        )
+        self.assertEqual(
+            [1], [f['properties']['count'] for f in self.get_features(1, 0, 1)]
+        )
+        self.assertEqual([], self.get_features(1, 0, 0))
+
+    def test_tiles_edges(self):
+        for point in [Point(0.5, 45), Point(40, 45), Point(-0.5, 45)]:
+            LayerFactory(
+                envelope=get_centered_envelope(point=point, radius=1)
+            )
+
+        # The cells start at the edges of the tiles, 4 x 4 of them each
+        self.assertEqual(
+            [4], [f['properties']['count'] for f in self.get_features(1, 1, 0)]
+        )
+        features = self.get_features(1, 0, 0)
+        self.assertEqual([1], [f['properties']['count'] for f in features])
+        self.assertAlmostEqual(
+            -0.5, features[0]['geometry']['coordinates'][0], places=6
+        )
+
+    def test_cached(self):
+        with patch.object(
+            clusters, 'build_clusters', wraps=clusters.build_clusters
+        ) as build_clusters:
+            self.get_features(0, 0, 0)
+            self.get_features(0, 0, 0)
+            self.assertEqual(1, build_clusters.call_count)
+
+            self.get_features(1, 1, 0)
+            self.assertEqual(2, build_clusters.call_count)
+
+    def test_not_found(self):
+        response = self.client.get(reverse('clusters', args=[2, 4, 0]))
+        self.assertEqual(404, response.status_code)
+
+        response = self.client.get(reverse('clusters', args=[23, 0, 0]))
+        self.assertEqual(404, response.status_code)
@@ -0,0 +1,48 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.reverse import reverse
+
+from tests.rhodonea_mapper.factories import RhodoneaFactory
+
+
+class ExportViewTests(TestCase):
+    def setUp(self):
+        self.rh = RhodoneaFactory()
+        self.client.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        ))
+
+    def test_ndjson(self):
+        response = self.client.get(reverse('export', args=['ndjson']))
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        self.assertEqual('application/x-ndjson', response['content-type'])
+
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(1, len(lines))
+        feature = json.loads(lines[0])
+        self.assertEqual(self.rh.layer.id, feature['id'])
+        self.assertEqual(
+            self.rh.id, feature['properties']['rhodoneas'][0]['id']
+        )
+
+    def test_geojson(self):
+        response = self.client.get(reverse('export', args=['geojson']))
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('application/geo+json', response['content-type'])
+        self.assertIn(
+            'rhodonea_mapper.geojson', response['content-disposition']
+        )
+
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(
+            [self.rh.layer.id], [f['id'] for f in data['features']]
+        )
+
+    def test_forbidden(self):
+        self.client.logout()
+
+        response = self.client.get(reverse('export', args=['ndjson']))
+        self.assertEqual(403, response.status_code)
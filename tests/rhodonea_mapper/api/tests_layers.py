@@ -3,14 +3,19 @@ import uuid
 from unittest.mock import patch, PropertyMock
 
 from django.contrib.gis.geos import Point
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 from rest_framework.reverse import reverse
 
 from rhodonea_mapper.api.serializers import (
     LayerSerializer,
-    LayerDetailSerializer,
+    LayerDetailReadSerializer,
 )
+from rhodonea_mapper.counters import overlays_counter
+from rhodonea_mapper.geometry import encode_polylines
 from rhodonea_mapper.models import Layer
 
 from tests.rhodonea_mapper.factories import (
@@ -31,7 +36,9 @@ class LayersViewSetDetailTests(TestCase):
             get_allowed_methods(response)
         )
 
-    @patch.object(LayerDetailSerializer, 'data', new_callable=PropertyMock)
+    @patch.object(
+        LayerDetailReadSerializer, 'data', new_callable=PropertyMock
+    )
     def test(self, data):
         overlays_count = 10
         layer = LayerFactory(overlays_count=overlays_count)
@@ -39,13 +46,13 @@ class LayersViewSetDetailTests(TestCase):
         RhodoneaFactory(layer=layer)
         RhodoneaFactory(layer=layer)
 
-        data.return_value = uuid.uuid4()
+        data.return_value = {'id': layer.id, 'title': str(uuid.uuid4())}
 
         response = self.client.get(reverse('layer-detail', args=[layer.id]))
         self.assertEqual(200, response.status_code)
 
         self.assertEqual(
-            str(data()),
+            {**data(), 'overlays_count': overlays_count + 1},
             response.json()
         )
 
@@ -56,6 +63,200 @@ class LayersViewSetDetailTests(TestCase):
         response = self.client.get(reverse('layer-detail', args=[123]))
         self.assertEqual(404, response.status_code)
 
+    def test_conditional(self):
+        rh = RhodoneaFactory()
+        layer = rh.layer
+        url = reverse('layer-detail', args=[layer.id])
+
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        last_modified = response['Last-Modified']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response['ETag'])
+
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(304, response.status_code)
+
+        layer.refresh_from_db()
+        self.assertEqual(3, layer.overlays_count)
+
+        # The overlays count is live, hence the ETag is a weak one
+        response = self.client.get(url)
+        self.assertEqual(etag, response['ETag'])
+        self.assertEqual(4, response.json()['overlays_count'])
+
+        rh.name = 'New name'
+        rh.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+        self.assertEqual('New name', response.json()['rhodoneas'][0]['name'])
+
+    @patch.object(
+        LayerDetailReadSerializer, 'data', new_callable=PropertyMock
+    )
+    def test_cached(self, data):
+        layer = RhodoneaFactory().layer
+        data.return_value = {'id': layer.id}
+        url = reverse('layer-detail', args=[layer.id])
+
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(1, data.call_count)
+
+        self.client.get(url, data={'zoom': 3})
+        self.assertEqual(2, data.call_count)
+
+    @override_settings(RHODONEA_MAPPER_OVERLAYS_FLUSH_INTERVAL=60)
+    @patch.object(overlays_counter, 'start_flusher')
+    def test_overlays_count_pending(self, start_flusher):
+        layer = LayerFactory(overlays_count=10)
+        url = reverse('layer-detail', args=[layer.id])
+
+        # The counts not flushed yet are shown
+        for count in [11, 12]:
+            response = self.client.get(url)
+            self.assertEqual(count, response.json()['overlays_count'])
+        overlays_counter.flush()
+
+        layer.refresh_from_db()
+        self.assertEqual(12, layer.overlays_count)
+
+    def test_zoom(self):
+        rh = RhodoneaFactory(nodes_count=1000)
+        url = reverse('layer-detail', args=[rh.layer.id])
+
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        curve = response.json()['rhodoneas'][0]['curve']
+        self.assertEqual(1001, len(curve['coordinates']))
+
+        response = self.client.get(url, data={'zoom': 2})
+        self.assertEqual(200, response.status_code)
+        curve = response.json()['rhodoneas'][0]['curve']
+        self.assertLess(len(curve['coordinates']), 10)
+
+        response = self.client.get(url, data={'tolerance': 0.001})
+        self.assertEqual(200, response.status_code)
+        curve = response.json()['rhodoneas'][0]['curve']
+        self.assertLess(len(curve['coordinates']), 1001)
+
+    def test_invalid_zoom(self):
+        rh = RhodoneaFactory()
+        url = reverse('layer-detail', args=[rh.layer.id])
+
+        for zoom in ['abc', -1, 23]:
+            response = self.client.get(url, data={'zoom': zoom})
+            self.assertEqual(400, response.status_code)
+            self.assertIn('zoom', response.json())
+
+        for tolerance in ['abc', -1]:
+            response = self.client.get(url, data={'tolerance': tolerance})
+            self.assertEqual(400, response.status_code)
+            self.assertIn('tolerance', response.json())
+
+    def test_polyline(self):
+        rh = RhodoneaFactory(nodes_count=100)
+        url = reverse('layer-detail', args=[rh.layer.id])
+
+        response = self.client.get(url, data={'curve_format': 'polyline'})
+        self.assertEqual(200, response.status_code)
+        polyline = response.json()['rhodoneas'][0]['curve']
+        self.assertEqual(encode_polylines([rh.curve.coords])[0], polyline)
+
+        response = self.client.get(url, data={
+            'curve_format': 'polyline', 'precision': 6
+        })
+        self.assertEqual(
+            encode_polylines([rh.curve.coords], 6)[0],
+            response.json()['rhodoneas'][0]['curve'],
+        )
+
+        # Only the rhodoneas are fetched and no polyline is encoded again
+        with patch(
+            'rhodonea_mapper.api.serializers.encode_polylines'
+        ) as encode, self.assertNumQueries(1):
+            data = LayerDetailReadSerializer(rh.layer, context={
+                'polyline_precision': 5
+            }).data
+        encode.assert_not_called()
+        self.assertEqual(polyline, data['rhodoneas'][0]['curve'])
+
+    def test_invalid_polyline(self):
+        rh = RhodoneaFactory()
+        url = reverse('layer-detail', args=[rh.layer.id])
+
+        response = self.client.get(url, data={'curve_format': 'wkt'})
+        self.assertEqual(400, response.status_code)
+        self.assertIn('curve_format', response.json())
+
+        for precision in ['abc', 0, 7]:
+            response = self.client.get(url, data={
+                'curve_format': 'polyline', 'precision': precision
+            })
+            self.assertEqual(400, response.status_code)
+            self.assertIn('precision', response.json())
+
+        # Ignored along with GeoJSON curves
+        response = self.client.get(url, data={'precision': 'abc'})
+        self.assertEqual(200, response.status_code)
+
+
+class LayersViewSetBatchTests(TestCase):
+    def setUp(self):
+        self.layers = [LayerFactory(overlays_count=10) for i in range(3)]
+        for layer in self.layers:
+            RhodoneaFactory(layer=layer)
+            RhodoneaFactory(layer=layer)
+
+    def get_batch(self, ids, **params):
+        return self.client.get(reverse('layer-batch'), data={
+            'ids': ','.join(map(str, ids)), **params
+        })
+
+    def test(self):
+        l1, l2, l3 = self.layers
+        response = self.get_batch([l3.id, l1.id, 123, l3.id], zoom=3)
+        self.assertEqual(200, response.status_code)
+
+        results = response.json()['results']
+        self.assertEqual([11, 11], [r['overlays_count'] for r in results])
+
+        # Same representations as the details, but the overlays counts
+        details = [
+            self.client.get(
+                reverse('layer-detail', args=[layer.id]), data={'zoom': 3}
+            ).json()
+            for layer in [l3, l1]
+        ]
+        self.assertEqual([12, 12], [d['overlays_count'] for d in details])
+        self.assertEqual(
+            [{**d, 'overlays_count': None} for d in details],
+            [{**r, 'overlays_count': None} for r in results]
+        )
+
+        for layer, count in zip(self.layers, [12, 10, 12]):
+            layer.refresh_from_db()
+            self.assertEqual(count, layer.overlays_count)
+
+    def test_invalid(self):
+        for ids in ['', 'abc', '1,a', ','.join(map(str, range(51)))]:
+            response = self.client.get(
+                reverse('layer-batch'), data={'ids': ids}
+            )
+            self.assertEqual(400, response.status_code)
+            self.assertIn('ids', response.json())
+
+        response = self.client.get(reverse('layer-batch'))
+        self.assertEqual(400, response.status_code)
+
 
 class LayersViewSetTests(TestCase):
     def setUp(self):
@@ -119,6 +320,183 @@ class LayersViewSetTests(TestCase):
             [x['id'] for x in response.json()['results']]
         )
 
+    def search(self, search, **params):
+        response = self.client.get(reverse('layer-list'), data={
+            'search': search, **params
+        })
+        self.assertEqual(200, response.status_code)
+        return [x['id'] for x in response.data['results']]
+
+    def test_search(self):
+        l1 = LayerFactory(title='Roses of Padua', notes='Drawn in spring')
+        l2 = LayerFactory(title='Daisies', notes='Drawn by the river')
+        RhodoneaFactory(layer=l2, name='Paddington rose')
+        l3 = LayerFactory(title='Tulips', notes=None)
+
+        self.assertEqual([l3.id, l2.id, l1.id], self.search(''))
+        # Every word is a prefix
+        self.assertEqual([l2.id, l1.id], self.search('pad'))
+        self.assertEqual([l2.id, l1.id], self.search('drawn'))
+        self.assertEqual([l1.id], self.search('drawn spr'))
+        self.assertEqual([l2.id], self.search('paddington'))
+        # Typos in the titles are forgiven
+        self.assertEqual([l3.id], self.search('Tullips'))
+        self.assertEqual([], self.search('lilies'))
+        self.assertEqual([], self.search('&!:*'))
+
+    def test_search_in_bbox(self):
+        l1 = LayerFactory(title='Roses', envelope=get_centered_envelope(
+            point=Point(10, 45), radius=10
+        ))
+        LayerFactory(title='Roses', envelope=get_centered_envelope(
+            point=Point(10, -45), radius=10
+        ))
+        LayerFactory(title='Tulips', envelope=get_centered_envelope(
+            point=Point(10, 5), radius=10
+        ))
+
+        bbox = get_centered_envelope(
+            point=Point(10, 20), radius=15
+        ).extent
+
+        self.assertEqual([l1.id], self.search(
+            'roses', in_bbox=','.join(map(str, bbox))
+        ))
+
+    def get_cursor_pages(self, **params):
+        pages = []
+        url = reverse('layer-list')
+        params = {'pagination': 'cursor', 'limit': 2, **params}
+
+        while url:
+            response = self.client.get(url, data=params)
+            self.assertEqual(200, response.status_code)
+            self.assertNotIn('count', response.data)
+            pages.append([x['id'] for x in response.data['results']])
+
+            # The next link carries all the parameters along
+            url, params = response.data['next'], {}
+
+        return pages
+
+    def test_cursor(self):
+        created = timezone.now()
+        layers = [LayerFactory() for i in range(3)]
+        # Layers created at the same time are ordered by id, these ones are
+        # the oldest and straddle the second and the third page.
+        layers += [LayerFactory(created=created) for i in range(2)]
+
+        pages = self.get_cursor_pages()
+
+        self.assertEqual(
+            [layers[i].id for i in [2, 1, 0, 4, 3]],
+            sum(pages, [])
+        )
+        self.assertEqual([2, 2, 1], [len(page) for page in pages])
+
+        # An empty cursor stands for the first page
+        self.assertEqual(pages, self.get_cursor_pages(cursor=''))
+
+    def test_cursor_in_bbox(self):
+        l1 = LayerFactory(envelope=get_centered_envelope(
+            point=Point(10, 45), radius=10
+        ))
+        LayerFactory(envelope=get_centered_envelope(
+            point=Point(10, -45), radius=10
+        ))
+        l3 = LayerFactory(envelope=get_centered_envelope(
+            point=Point(10, 5), radius=10
+        ))
+        l4 = LayerFactory(envelope=get_centered_envelope(
+            point=Point(10, 25), radius=10
+        ))
+
+        bbox = get_centered_envelope(
+            point=Point(10, 20), radius=15
+        ).extent
+
+        pages = self.get_cursor_pages(in_bbox=','.join(map(str, bbox)))
+
+        self.assertEqual([[l4.id, l3.id], [l1.id]], pages)
+
+
+class LayersViewSetQueriesTests(TestCase):
+    '''
+    The number of queries run by the endpoints must not depend on the number
+    of layers or rhodoneas involved.
+    '''
+    def test_list(self):
+        for layers_count in [1, 4, 12]:
+            for i in range(layers_count):
+                RhodoneaFactory()
+
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('layer-list'))
+            self.assertEqual(200, response.status_code)
+
+            # count and page
+            self.assertEqual(2, len(queries))
+            for query in queries:
+                self.assertNotIn('"notes"', query['sql'])
+
+    def test_list_cursor(self):
+        for i in range(12):
+            LayerFactory()
+
+        url = reverse('layer-list')
+        data = {'pagination': 'cursor', 'limit': 3}
+        while url:
+            # page only, no count nor offset
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, data=data)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(1, len(queries))
+            self.assertNotIn('OFFSET', queries[0]['sql'])
+
+            url, data = response.data['next'], {}
+
+    def test_detail(self):
+        for rhodoneas_count in [1, 4, 12]:
+            layer = LayerFactory()
+            for i in range(rhodoneas_count):
+                RhodoneaFactory(layer=layer)
+            url = reverse('layer-detail', args=[layer.id])
+
+            # layer, overlays counter and rhodoneas
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(
+                rhodoneas_count, len(response.json()['rhodoneas'])
+            )
+
+            # layer and overlays counter
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(200, response.status_code)
+
+    def test_batch(self):
+        ids = []
+        for layers_count in [1, 4, 12]:
+            for i in range(layers_count):
+                ids.append(RhodoneaFactory().layer.id)
+            url = reverse('layer-batch')
+
+            # layers, overlays counters and rhodoneas
+            with self.assertNumQueries(3):
+                response = self.client.get(url, data={
+                    'ids': ','.join(map(str, ids))
+                })
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(len(ids), len(response.json()['results']))
+
+            # layers and overlays counters
+            with self.assertNumQueries(2):
+                response = self.client.get(url, data={
+                    'ids': ','.join(map(str, ids))
+                })
+            self.assertEqual(200, response.status_code)
+
 
 class LayersViewSetCreateTests(TestCase):
     def test_missing_rhodoneas(self):
@@ -0,0 +1,114 @@
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+from rest_framework.reverse import reverse
+
+from rhodonea_mapper.api.renderers import (
+    CURVE_SCALE,
+    ColumnarRenderer,
+    decode_layers,
+    encode_layers,
+    get_point_coords,
+)
+from rhodonea_mapper.api.serializers import LayerDetailReadSerializer
+from tests.rhodonea_mapper.factories import LayerFactory, RhodoneaFactory
+
+
+class ColumnarTests(TestCase):
+    def setUp(self):
+        self.layers = [LayerFactory() for i in range(2)]
+        RhodoneaFactory(layer=self.layers[0])
+        RhodoneaFactory(layer=self.layers[0], point=Point(179.99, 0))
+        RhodoneaFactory(layer=self.layers[1])
+
+    def assertDecoded(self, layers, payload):
+        header, columns = decode_layers(payload)
+        self.assertEqual(
+            [len(layer['rhodoneas']) for layer in layers],
+            [layer['rhodoneas_count'] for layer in header['layers']]
+        )
+        self.assertEqual(layers[0]['title'], header['layers'][0]['title'])
+
+        rhodoneas = [rh for layer in layers for rh in layer['rhodoneas']]
+        self.assertEqual(
+            [rh['name'] for rh in rhodoneas], header['fields']['name']
+        )
+        self.assertNotIn('point', header['fields'])
+
+        curves = columns['curves'].reshape(-1, 2).astype(int)
+        start = 0
+        for i, rh in enumerate(rhodoneas):
+            self.assertEqual(
+                list(get_point_coords(rh['point'])),
+                [columns['lng'][i], columns['lat'][i]]
+            )
+            self.assertEqual(float(rh['r']), columns['r'][i])
+            self.assertEqual(rh['nodes_count'], columns['nodes_count'][i])
+
+            coords = rh['curve']['coordinates']
+            size = columns['curve_sizes'][i]
+            self.assertEqual(len(coords), size)
+
+            decoded = curves[start:start + size].cumsum(axis=0) / CURVE_SCALE
+            for (x, y), (dx, dy) in zip(coords, decoded):
+                self.assertAlmostEqual(x, (dx + 180) % 360 - 180, places=6)
+                self.assertAlmostEqual(y, dy, places=6)
+            start += size
+
+    def test(self):
+        layers = LayerDetailReadSerializer(self.layers, many=True).data
+        self.assertDecoded(layers, encode_layers(layers))
+
+    def test_empty(self):
+        header, columns = decode_layers(encode_layers([]))
+        self.assertEqual([], header['layers'])
+        self.assertEqual(0, len(columns['curves']))
+
+    def test_retrieve(self):
+        layer = self.layers[0]
+        url = reverse('layer-detail', args=[layer.id])
+
+        response = self.client.get(
+            url, HTTP_ACCEPT=ColumnarRenderer.media_type
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(ColumnarRenderer.media_type, response['Content-Type'])
+        self.assertIn('Accept', response['Vary'])
+        self.assertDecoded([self.client.get(url).json()], response.content)
+
+        # Formats do not share ETags
+        self.assertNotEqual(
+            self.client.get(url)['ETag'], response['ETag']
+        )
+        response = self.client.get(
+            url,
+            data={'format': 'columnar'},
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(304, response.status_code)
+
+    def test_batch(self):
+        ids = ','.join(str(layer.id) for layer in self.layers)
+        response = self.client.get(
+            reverse('layer-batch'), data={'ids': ids, 'format': 'columnar'}
+        )
+        self.assertEqual(200, response.status_code)
+
+        json_response = self.client.get(
+            reverse('layer-batch'), data={'ids': ids}
+        )
+        self.assertDecoded(json_response.json()['results'], response.content)
+        self.assertLess(len(response.content), len(json_response.content))
+
+    def test_errors(self):
+        response = self.client.get(
+            reverse('layer-detail', args=[123]), data={'format': 'columnar'}
+        )
+        self.assertEqual(404, response.status_code)
+        self.assertEqual('application/json', response['Content-Type'])
+        self.assertIn('detail', response.json())
+
+        response = self.client.get(
+            reverse('layer-list'),
+            HTTP_ACCEPT=ColumnarRenderer.media_type,
+        )
+        self.assertEqual(406, response.status_code)
@@ -1,11 +1,16 @@
+from django.db.models import Prefetch
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
 
 from rhodonea_mapper.api.serializers import (
     RhodoneaDetailSerializer,
+    LayerDetailReadSerializer,
     LayerDetailSerializer,
     LayerSerializer,
 )
+from rhodonea_mapper.models import Layer, Rhodonea
 from tests.rhodonea_mapper.factories import (
+    LayerFactory,
     RhodoneaFactory,
 )
 
@@ -30,9 +35,36 @@ class RhodoneaDetailsSerializerTests(TestCase):
                 'nodes_count',
                 'stroke_color',
                 'stroke_weight',
+                'curve',
             },
             data.keys()
         )
+        self.assertEqual('LineString', data['curve']['type'])
+        self.assertEqual(rh.nodes_count + 1, len(data['curve']['coordinates']))
+
+    def test_curve_tolerance(self):
+        rh = RhodoneaFactory(nodes_count=1000)
+
+        data = RhodoneaDetailSerializer(rh, context={'tolerance': 1}).data
+
+        self.assertLess(len(data['curve']['coordinates']), 10)
+
+    def test_invalid_d(self):
+        serializer = RhodoneaDetailSerializer(data={'d': 0})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(
+            'This value cannot be zero.', serializer.errors['d'][0]
+        )
+
+    def test_invalid_nodes_count(self):
+        serializer = RhodoneaDetailSerializer(data={'nodes_count': 0})
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(
+            'Ensure this value is greater than 0.',
+            serializer.errors['nodes_count'][0]
+        )
 
 
 class LayerSerializerTests(TestCase):
@@ -73,3 +105,50 @@ class LayerDetailsSerializerTests(TestCase):
             },
             data.keys()
         )
+
+
+class LayerDetailReadSerializerTests(TestCase):
+    def setUp(self):
+        layer = LayerFactory(notes=None)
+        RhodoneaFactory(layer=layer)
+        RhodoneaFactory(layer=layer, notes='Some notes')
+        RhodoneaFactory(layer=layer)
+
+        self.layer = Layer.objects.prefetch_related(Prefetch(
+            'rhodoneas', queryset=Rhodonea.objects.order_by('pk')
+        )).get(pk=layer.pk)
+
+    def assertSameRepresentation(self, context):
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(
+                LayerDetailSerializer(self.layer, context=context).data
+            ),
+            renderer.render(
+                LayerDetailReadSerializer(self.layer, context=context).data
+            )
+        )
+
+    def test(self):
+        self.assertSameRepresentation({})
+
+    def test_tolerance(self):
+        self.assertSameRepresentation({'tolerance': 0.001})
+
+    def test_queries(self):
+        with self.assertNumQueries(1):
+            LayerDetailReadSerializer(self.layer).data
+
+    def test_many(self):
+        layer = LayerFactory()
+        RhodoneaFactory(layer=layer)
+        layers = [self.layer, LayerFactory(), layer]
+
+        with self.assertNumQueries(1):
+            data = LayerDetailReadSerializer(layers, many=True).data
+
+        self.assertEqual(
+            [LayerDetailReadSerializer(layer).data for layer in layers],
+            data
+        )
+        self.assertEqual([3, 0, 1], [len(x['rhodoneas']) for x in data])
@@ -0,0 +1,49 @@
+import math
+
+from django.contrib.gis.geos import Point
+from django.test import TestCase
+from rest_framework.reverse import reverse
+
+from tests.rhodonea_mapper.factories import LayerFactory, RhodoneaFactory
+
+
+def get_tile(lng, lat, z):
+    n = 2 ** z
+    lat = math.radians(lat)
+    y = (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2
+    return z, int((lng + 180) / 360 * n), int(y * n)
+
+
+class TilesViewTests(TestCase):
+    def setUp(self):
+        layer = LayerFactory(title='Tiled layer')
+        RhodoneaFactory(layer=layer, point=Point(10, 45), name='Tiled rh')
+
+    def test(self):
+        response = self.client.get(
+            reverse('tile', args=get_tile(10, 45, 8))
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            'application/vnd.mapbox-vector-tile', response['content-type']
+        )
+        self.assertIn('public', response['cache-control'])
+
+        self.assertIn(b'rhodoneas', response.content)
+        self.assertIn(b'Tiled rh', response.content)
+        self.assertIn(b'layers', response.content)
+        self.assertIn(b'Tiled layer', response.content)
+
+    def test_empty(self):
+        response = self.client.get(
+            reverse('tile', args=get_tile(-120, -45, 8))
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(b'', response.content)
+
+    def test_not_found(self):
+        response = self.client.get(reverse('tile', args=[2, 4, 0]))
+        self.assertEqual(404, response.status_code)
+
+        response = self.client.get(reverse('tile', args=[23, 0, 0]))
+        self.assertEqual(404, response.status_code)
@@ -7,6 +7,7 @@ from faker import Faker
 from pyproj import Geod
 
 from rhodonea_mapper.models import Rhodonea, Layer
+from rhodonea_mapper.signals import defer_envelope_updates
 
 
 fake = Faker(['it_IT', 'en_GB', 'zh_TW'])
@@ -67,12 +68,13 @@ def create_random_layers(base_point, min_rhodoneas=1, max_rhodoneas=5):
     '''
     layer = LayerFactory()
 
-    for i in range(random.randint(min_rhodoneas, max_rhodoneas)):
-        point = Point(geod.fwd(
-            base_point[0], base_point[1],
-            random.randint(0, 360), random.randint(3000, 5000)
-        )[:2])
+    with defer_envelope_updates():
+        for i in range(random.randint(min_rhodoneas, max_rhodoneas)):
+            point = Point(geod.fwd(
+                base_point[0], base_point[1],
+                random.randint(0, 360), random.randint(3000, 5000)
+            )[:2])
 
-        RhodoneaFactory(layer=layer, point=point)
+            RhodoneaFactory(layer=layer, point=point)
 
     return layer
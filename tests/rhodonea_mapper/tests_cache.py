@@ -0,0 +1,68 @@
+from unittest.mock import Mock
+
+from django.test import TestCase
+
+from rhodonea_mapper.cache import (
+    build_etag,
+    get_cached_many,
+    get_layer_cache_key,
+    get_layer_payload,
+)
+from tests.rhodonea_mapper.factories import LayerFactory, RhodoneaFactory
+
+
+class GetLayerPayloadTests(TestCase):
+    def test(self):
+        layer = LayerFactory()
+        build = Mock(return_value={'id': layer.id})
+
+        etag, data = get_layer_payload(layer, build, 'detail')
+        self.assertEqual({'id': layer.id}, data)
+        self.assertEqual(build_etag(data), etag)
+
+        self.assertEqual(
+            (etag, data), get_layer_payload(layer, build, 'detail')
+        )
+        self.assertEqual(1, build.call_count)
+
+        get_layer_payload(layer, build, 'detail', 0.1)
+        self.assertEqual(2, build.call_count)
+
+    def test_invalidated(self):
+        rh = RhodoneaFactory()
+        layer = rh.layer
+        key = get_layer_cache_key(layer)
+
+        rh.name = 'New name'
+        rh.save()
+
+        self.assertNotEqual(key, get_layer_cache_key(layer))
+
+
+class GetCachedManyTests(TestCase):
+    def test(self):
+        build_many = Mock(side_effect=lambda objs: [obj * 2 for obj in objs])
+
+        self.assertEqual(
+            [2, 4], get_cached_many(['test:1', 'test:2'], [1, 2], build_many)
+        )
+        self.assertEqual(
+            [4, 6, 2],
+            get_cached_many(['test:2', 'test:3', 'test:1'], [2, 3, 1],
+                            build_many),
+        )
+        self.assertEqual(2, build_many.call_count)
+        build_many.assert_called_with([3])
+
+
+class BuildEtagTests(TestCase):
+    def test(self):
+        self.assertEqual(
+            build_etag({'a': 1, 'b': [1, 2]}),
+            build_etag({'b': [1, 2], 'a': 1}),
+        )
+        self.assertNotEqual(
+            build_etag({'a': 1}),
+            build_etag({'a': 2}),
+        )
+        self.assertTrue(build_etag({}).startswith('"'))
@@ -0,0 +1,82 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rhodonea_mapper.counters import OverlaysCounter
+from rhodonea_mapper.models import Layer
+from tests.rhodonea_mapper.factories import LayerFactory
+
+
+class OverlaysCounterTests(TestCase):
+    def setUp(self):
+        self.l1 = LayerFactory(overlays_count=10)
+        self.l2 = LayerFactory(overlays_count=20)
+        self.counter = OverlaysCounter()
+
+    def get_counts(self):
+        return [
+            Layer.objects.get(pk=layer.pk).overlays_count
+            for layer in [self.l1, self.l2]
+        ]
+
+    def test_immediate(self):
+        self.counter.add(self.l1.pk)
+        self.counter.add(self.l1.pk, self.l2.pk)
+
+        self.assertEqual({}, self.counter.pending())
+        self.assertEqual([12, 21], self.get_counts())
+
+    @override_settings(RHODONEA_MAPPER_OVERLAYS_FLUSH_INTERVAL=60)
+    @patch.object(OverlaysCounter, 'start_flusher')
+    def test_buffered(self, start_flusher):
+        self.counter.add(self.l1.pk)
+        self.counter.add(self.l1.pk, self.l2.pk)
+
+        start_flusher.assert_called_with(60)
+        self.assertEqual(
+            {self.l1.pk: 2, self.l2.pk: 1}, self.counter.pending()
+        )
+        self.assertEqual([10, 20], self.get_counts())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(2, self.counter.flush())
+
+        updates = [
+            q for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE')
+        ]
+        self.assertEqual(2, len(updates))
+
+        self.assertEqual({}, self.counter.pending())
+        self.assertEqual([12, 21], self.get_counts())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(0, self.counter.flush())
+
+    @override_settings(RHODONEA_MAPPER_OVERLAYS_FLUSH_INTERVAL=60)
+    @patch.object(OverlaysCounter, 'start_flusher')
+    def test_flush_failed(self, start_flusher):
+        self.counter.add(self.l1.pk)
+
+        with patch.object(
+            Layer.objects, 'add_overlays', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.counter.flush()
+
+        self.assertEqual({self.l1.pk: 1}, self.counter.pending())
+
+
+class AddOverlaysTests(TestCase):
+    def test(self):
+        l1 = LayerFactory(overlays_count=1)
+        l2 = LayerFactory(overlays_count=2)
+        l3 = LayerFactory(overlays_count=3)
+
+        Layer.objects.add_overlays({l1.pk: 5, l2.pk: 5, l3.pk: 1})
+
+        for layer, count in [(l1, 6), (l2, 7), (l3, 4)]:
+            layer.refresh_from_db()
+            self.assertEqual(count, layer.overlays_count)
@@ -0,0 +1,97 @@
+import json
+
+from django.test import TestCase
+
+from rhodonea_mapper.export import iter_export, iter_features
+from rhodonea_mapper.models import Layer
+
+from tests.rhodonea_mapper.factories import LayerFactory, RhodoneaFactory
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.l1 = LayerFactory()
+        self.l1_rhodoneas = [RhodoneaFactory(layer=self.l1) for i in range(3)]
+        self.l2 = LayerFactory()
+        self.l3 = LayerFactory()
+        self.l3_rhodoneas = [RhodoneaFactory(layer=self.l3) for i in range(2)]
+
+    def test_iter_features(self):
+        # Layers and rhodoneas, whatever their number
+        with self.assertNumQueries(2):
+            features = list(iter_features(chunk_size=2))
+
+        self.assertEqual(
+            [self.l1.id, self.l2.id, self.l3.id],
+            [f['id'] for f in features]
+        )
+
+        f1, f2, f3 = features
+        self.assertEqual('Feature', f1['type'])
+        self.assertEqual('Polygon', f1['geometry']['type'])
+        self.l1.refresh_from_db()
+        self.assertEqual(
+            self.l1.envelope.coords, f1['geometry']['coordinates']
+        )
+        self.assertEqual(self.l1.title, f1['properties']['title'])
+        self.assertNotIn('envelope', f1['properties'])
+
+        self.assertEqual(
+            [rh.id for rh in self.l1_rhodoneas],
+            [f['id'] for f in f1['properties']['rhodoneas']]
+        )
+        rh = self.l1_rhodoneas[0]
+        feature = f1['properties']['rhodoneas'][0]
+        self.assertEqual(
+            {'type': 'Point', 'coordinates': rh.point.coords},
+            feature['geometry']
+        )
+        self.assertEqual(rh.name, feature['properties']['name'])
+        self.assertEqual(rh.nodes_count, feature['properties']['nodes_count'])
+        self.assertNotIn('curve', feature['properties'])
+
+        self.assertIsNone(f2['geometry'])
+        self.assertEqual([], f2['properties']['rhodoneas'])
+        self.assertEqual(
+            [rh.id for rh in self.l3_rhodoneas],
+            [f['id'] for f in f3['properties']['rhodoneas']]
+        )
+
+    def test_iter_features_layers(self):
+        features = list(iter_features(
+            Layer.objects.filter(pk__in=[self.l2.pk, self.l3.pk])
+        ))
+
+        self.assertEqual([self.l2.id, self.l3.id], [f['id'] for f in features])
+        self.assertEqual(
+            [rh.id for rh in self.l3_rhodoneas],
+            [f['id'] for f in features[1]['properties']['rhodoneas']]
+        )
+
+    def test_ndjson(self):
+        lines = ''.join(iter_export('ndjson')).splitlines()
+
+        self.assertEqual(3, len(lines))
+        self.assertEqual(
+            [self.l1.id, self.l2.id, self.l3.id],
+            [json.loads(line)['id'] for line in lines]
+        )
+
+    def test_geojson(self):
+        data = json.loads(''.join(iter_export('geojson')))
+
+        self.assertEqual('FeatureCollection', data['type'])
+        self.assertEqual(
+            [self.l1.id, self.l2.id, self.l3.id],
+            [f['id'] for f in data['features']]
+        )
+
+        Layer.objects.all().delete()
+        data = json.loads(''.join(iter_export('geojson')))
+        self.assertEqual([], data['features'])
+
+    def test_overlays_untouched(self):
+        list(iter_features())
+
+        self.l1.refresh_from_db()
+        self.assertEqual(0, self.l1.overlays_count)
@@ -0,0 +1,119 @@
+import numpy as np
+from django.test import TestCase
+
+from rhodonea_mapper.generator import (
+    HOTSPOTS_COUNT,
+    MAX_LATITUDE,
+    generate,
+    generate_batch,
+    random_centres,
+)
+from rhodonea_mapper.models import Layer, Rhodonea
+
+
+class GenerateBatchTests(TestCase):
+    def setUp(self):
+        self.hotspots = random_centres(
+            np.random.default_rng(0), HOTSPOTS_COUNT
+        )
+
+    def generate_batch(self, seed=1, distribution='uniform'):
+        return generate_batch((
+            np.random.SeedSequence(seed),
+            50,
+            (0, 3),
+            (10, 20),
+            distribution,
+            self.hotspots,
+        ))
+
+    def test(self):
+        batch = self.generate_batch()
+
+        self.assertEqual(50, len(batch['counts']))
+        self.assertTrue(np.all(batch['counts'] <= 3))
+        total = batch['counts'].sum()
+
+        for key in ['lngs', 'lats', 'r', 'n', 'd', 'nodes_count']:
+            self.assertEqual(total, len(batch[key]))
+        self.assertEqual(total, len(batch['curves']))
+        self.assertEqual((total, 4), batch['extents'].shape)
+
+        self.assertTrue(np.all(abs(batch['lats']) < MAX_LATITUDE + 1))
+        self.assertTrue(np.all(batch['n'] >= 1))
+        self.assertTrue(np.all(batch['d'] >= 1))
+        for nodes_count, curve in zip(batch['nodes_count'], batch['curves']):
+            self.assertTrue(10 <= nodes_count <= 20)
+            self.assertEqual((nodes_count + 1, 2), curve.shape)
+
+    def test_seed(self):
+        for distribution in ['uniform', 'clustered']:
+            batch = self.generate_batch(1, distribution)
+            same = self.generate_batch(1, distribution)
+            other = self.generate_batch(2, distribution)
+
+            self.assertTrue(np.array_equal(batch['lngs'], same['lngs']))
+            self.assertFalse(np.array_equal(batch['lngs'], other['lngs']))
+
+    def test_clustered(self):
+        batch = self.generate_batch(distribution='clustered')
+
+        # Every layer is around one of the hotspots
+        for lng, lat in zip(batch['lngs'], batch['lats']):
+            distances = np.hypot(
+                (self.hotspots[0] - lng + 180) % 360 - 180,
+                self.hotspots[1] - lat,
+            )
+            self.assertLess(distances.min(), 15)
+
+
+class GenerateTests(TestCase):
+    def test(self):
+        callback_calls = []
+
+        # Savepoint, layers, rhodoneas and release of each batch
+        with self.assertNumQueries(4 * 4):
+            layers_count, rhodoneas_count = generate(
+                10,
+                rhodoneas_range=(1, 3),
+                nodes_range=(50, 100),
+                seed=1,
+                processes=1,
+                batch_size=3,
+                callback=lambda *counts: callback_calls.append(counts),
+            )
+
+        self.assertEqual(10, layers_count)
+        self.assertEqual(10, Layer.objects.count())
+        self.assertEqual(rhodoneas_count, Rhodonea.objects.count())
+        self.assertEqual(
+            [3, 6, 9, 10], [layers for layers, rhs in callback_calls]
+        )
+
+        for layer in Layer.objects.all():
+            self.assertTrue(1 <= layer.rhodoneas.count() <= 3)
+
+            envelope = layer.envelope
+            layer.set_envelope()
+            for a, b in zip(envelope.extent, layer.envelope.extent):
+                self.assertAlmostEqual(a, b)
+
+        for rh in Rhodonea.objects.all()[:5]:
+            self.assertTrue(rh.curve.equals_exact(rh.build_curve(), 1e-9))
+            for a, b in zip(rh.envelope.extent, rh.build_envelope().extent):
+                self.assertAlmostEqual(a, b)
+
+    def test_seed(self):
+        fields = ['point', 'r', 'n', 'd', 'rotation', 'nodes_count']
+
+        generate(5, seed=1, processes=1, batch_size=2)
+        first = list(
+            Rhodonea.objects.order_by('pk').values_list(*fields)
+        )
+        Layer.objects.all().delete()
+
+        generate(5, seed=1, processes=1, batch_size=2)
+        self.assertEqual(
+            first,
+            list(Rhodonea.objects.order_by('pk').values_list(*fields))
+        )
@@ -0,0 +1,212 @@
+from unittest.mock import patch
+
+from django.contrib.gis.geos import LineString, Point
+from django.test import TestCase, override_settings
+
+from rhodonea_mapper import geometry
+from rhodonea_mapper.geometry import (
+    WEB_MERCATOR_HALF_SIZE,
+    WGS84_GEOD,
+    build_curve,
+    build_curves,
+    build_curves_coords,
+    encode_polylines,
+    envelopes_extents,
+    linestring_coords,
+    rhodonea_polar,
+    shapes_cache,
+    tile_bounds,
+    zoom_resolution,
+)
+from tests.rhodonea_mapper.factories import LayerFactory, RhodoneaFactory
+
+
+class RhodoneaPolarTests(TestCase):
+    def test(self):
+        bearings, radii = rhodonea_polar(3, 5, -45, 75)
+
+        self.assertEqual(76, len(bearings))
+        self.assertEqual(76, len(radii))
+        self.assertAlmostEqual(45, bearings[0])
+        self.assertAlmostEqual(0, radii[0])
+        self.assertAlmostEqual(5 * 360 + 45, bearings[-1])
+
+
+class ShapesCacheTests(TestCase):
+    def setUp(self):
+        shapes_cache.clear()
+
+    def test(self):
+        bearings, radii = rhodonea_polar(3, 5, -45, 75)
+
+        self.assertIs(bearings, rhodonea_polar(3, 5, -45, 75)[0])
+        with self.assertRaises(ValueError):
+            radii[0] = 1
+
+        rhodonea_polar(3, 5, 45, 75)
+        self.assertEqual(
+            {
+                'size': 2,
+                'max_size': shapes_cache.DEFAULT_MAX_SIZE,
+                'hits': 1,
+                'misses': 2,
+                'evictions': 0,
+            },
+            shapes_cache.stats()
+        )
+
+    @override_settings(RHODONEA_MAPPER_SHAPES_CACHE_SIZE=2)
+    def test_evicted(self):
+        rhodonea_polar(1, 2, 0, 10)
+        rhodonea_polar(2, 3, 0, 10)
+        rhodonea_polar(1, 2, 0, 10)
+        rhodonea_polar(3, 4, 0, 10)
+        rhodonea_polar(1, 2, 0, 10)
+        rhodonea_polar(2, 3, 0, 10)
+
+        stats = shapes_cache.stats()
+        self.assertEqual(2, stats['size'])
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(4, stats['misses'])
+        self.assertEqual(2, stats['evictions'])
+
+    @override_settings(RHODONEA_MAPPER_SHAPES_CACHE_SIZE=0)
+    def test_disabled(self):
+        rhodonea_polar(1, 2, 0, 10)
+        rhodonea_polar(1, 2, 0, 10)
+
+        self.assertEqual(0, shapes_cache.stats()['size'])
+        self.assertEqual(2, shapes_cache.stats()['misses'])
+
+
+class BuildCurvesCoordsTests(TestCase):
+    def test_empty(self):
+        self.assertEqual([], build_curves_coords([]))
+
+    def test(self):
+        params = [
+            (10, 45, 1000, 3, 5, -45, 75),
+            (121.5, 25, 2500.5, 4, 3, 90, 100),
+        ]
+
+        with patch.object(
+            geometry.WGS84_GEOD, 'fwd', wraps=WGS84_GEOD.fwd
+        ) as fwd:
+            curves = build_curves_coords(params)
+
+        self.assertEqual(1, fwd.call_count)
+        self.assertEqual([(76, 2), (101, 2)], [c.shape for c in curves])
+
+        for (lng, lat, r, n, d, rotation, nodes_count), coords in zip(
+            params, curves
+        ):
+            bearings, radii = rhodonea_polar(n, d, rotation, nodes_count)
+            for i in (0, nodes_count // 3, nodes_count):
+                x, y, _ = WGS84_GEOD.fwd(lng, lat, bearings[i], radii[i] * r)
+                self.assertAlmostEqual(x, coords[i][0])
+                self.assertAlmostEqual(y, coords[i][1])
+
+
+class BuildCurveTests(TestCase):
+    def test(self):
+        rh = RhodoneaFactory(point=Point(10, 45), nodes_count=150)
+
+        curve = build_curve(rh)
+
+        self.assertEqual(4326, curve.srid)
+        self.assertEqual(151, len(curve))
+        self.assertAlmostEqual(10, curve[0][0])
+        self.assertAlmostEqual(45, curve[0][1])
+
+    def test_layer(self):
+        layer = LayerFactory()
+        RhodoneaFactory(layer=layer)
+        RhodoneaFactory(layer=layer)
+
+        rhodoneas = list(layer.rhodoneas.all())
+
+        self.assertEqual(
+            [build_curve(rh).wkt for rh in rhodoneas],
+            [curve.wkt for curve in build_curves(rhodoneas)]
+        )
+        self.assertEqual(
+            sorted(build_curve(rh).wkt for rh in rhodoneas),
+            sorted(curve.wkt for curve in layer.build_curves())
+        )
+
+
+class TileBoundsTests(TestCase):
+    def test(self):
+        half = WEB_MERCATOR_HALF_SIZE
+
+        self.assertEqual((-half, -half, half, half), tile_bounds(0, 0, 0))
+        self.assertEqual((0, 0, half, half), tile_bounds(1, 1, 0))
+        self.assertEqual((-half, -half, 0, 0), tile_bounds(1, 0, 1))
+
+    def test_zoom_resolution(self):
+        self.assertAlmostEqual(156543.03392804097, zoom_resolution(0))
+        self.assertAlmostEqual(
+            zoom_resolution(0) / 2 ** 10, zoom_resolution(10)
+        )
+
+
+class EnvelopesExtentsTests(TestCase):
+    def test(self):
+        extents = envelopes_extents([10, 121.5], [45, 25], [1000, 2500.5])
+
+        self.assertEqual((2, 4), extents.shape)
+        for extent, (lng, lat, r) in zip(
+            extents, [(10, 45, 1000), (121.5, 25, 2500.5)]
+        ):
+            self.assertEqual(
+                (
+                    WGS84_GEOD.fwd(lng, lat, -90, r)[0],
+                    WGS84_GEOD.fwd(lng, lat, 180, r)[1],
+                    WGS84_GEOD.fwd(lng, lat, 90, r)[0],
+                    WGS84_GEOD.fwd(lng, lat, 0, r)[1],
+                ),
+                tuple(extent)
+            )
+
+    def test_empty(self):
+        self.assertEqual((0, 4), envelopes_extents([], [], []).shape)
+
+
+class EncodePolylinesTests(TestCase):
+    def test(self):
+        # The example of the documentation of the format
+        self.assertEqual(
+            ['_p~iF~ps|U_ulLnnqC_mqNvxq`@', '', '_p~iF~ps|U'],
+            encode_polylines([
+                [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)],
+                [],
+                [(-120.2, 38.5)],
+            ]),
+        )
+
+    def test_precision(self):
+        self.assertEqual(
+            ['_izlhA~rlgdF'], encode_polylines([[(-120.2, 38.5)]], 6)
+        )
+
+    def test_empty(self):
+        self.assertEqual([], encode_polylines([]))
+        self.assertEqual(['', ''], encode_polylines([[], []]))
+
+
+class LinestringCoordsTests(TestCase):
+    def test(self):
+        coords = [(10, 45), (10.5, 45.25), (11, 46)]
+
+        self.assertEqual(
+            coords,
+            [tuple(c) for c in linestring_coords(
+                LineString(coords, srid=4326)
+            )],
+        )
+        self.assertEqual(
+            [(10, 45), (11, 46)],
+            [tuple(c) for c in linestring_coords(
+                LineString([(10, 45, 1), (11, 46, 2)])
+            )],
+        )
@@ -0,0 +1,183 @@
+import io
+import json
+from unittest.mock import patch
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from rhodonea_mapper.export import iter_export
+from rhodonea_mapper.importer import (
+    import_features,
+    iter_geojson_features,
+    iter_ndjson_features,
+)
+from rhodonea_mapper.models import Layer, Rhodonea
+
+from tests.rhodonea_mapper.factories import LayerFactory, RhodoneaFactory
+
+
+def get_rhodonea_feature(**properties):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [10, 45]},
+        'properties': {
+            'name': 'Rh',
+            'r': 1000.5,
+            'n': 3,
+            'd': 5,
+            'rotation': 45,
+            'nodes_count': 100,
+            **properties,
+        },
+    }
+
+
+def get_layer_feature(rhodoneas_count=2, **properties):
+    return {
+        'type': 'Feature',
+        'geometry': None,
+        'properties': {
+            'title': 'Layer',
+            'rhodoneas': [
+                get_rhodonea_feature() for i in range(rhodoneas_count)
+            ],
+            **properties,
+        },
+    }
+
+
+class FeaturesReadersTests(TestCase):
+    def setUp(self):
+        self.features = [get_layer_feature(i) for i in range(4)]
+
+    def test_ndjson(self):
+        f = io.StringIO(
+            '\n'.join(json.dumps(feature) for feature in self.features)
+            + '\n\n'
+        )
+        self.assertEqual(self.features, list(iter_ndjson_features(f)))
+
+    def test_geojson(self):
+        content = json.dumps({
+            'type': 'FeatureCollection',
+            'features': self.features,
+        }, indent=2)
+
+        # Features split across chunks
+        for chunk_size in [7, 100, len(content)]:
+            self.assertEqual(
+                self.features,
+                list(iter_geojson_features(io.StringIO(content), chunk_size))
+            )
+
+    def test_geojson_invalid(self):
+        with self.assertRaises(ValueError):
+            list(iter_geojson_features(io.StringIO('{"type": "Feature"}')))
+
+        content = json.dumps({'features': self.features})[:-10]
+        with self.assertRaises(ValueError):
+            list(iter_geojson_features(io.StringIO(content), 16))
+
+
+class ImportFeaturesTests(TestCase):
+    def test(self):
+        features = [
+            get_layer_feature(2, title='L1', overlays_count=5),
+            get_layer_feature(0, title='L2'),
+            get_layer_feature(3, title='L3', notes='Notes'),
+        ]
+
+        with patch.object(Layer, 'set_envelope') as set_envelope:
+            self.assertEqual((3, 5), import_features(features))
+        # Envelopes are not left to the signals
+        set_envelope.assert_not_called()
+
+        l1, l2, l3 = Layer.objects.order_by('pk')
+        self.assertEqual('L1', l1.title)
+        self.assertEqual(5, l1.overlays_count)
+        self.assertEqual('Notes', l3.notes)
+        self.assertIsNotNone(l1.created)
+
+        self.assertEqual(2, l1.rhodoneas.count())
+        self.assertEqual(0, l2.rhodoneas.count())
+        self.assertEqual(3, l3.rhodoneas.count())
+        self.assertIsNone(l2.envelope)
+
+        for layer in [l1, l3]:
+            envelope = layer.envelope
+            layer.set_envelope()
+            self.assertEqual(layer.envelope.extent, envelope.extent)
+
+        rh = l1.rhodoneas.first()
+        self.assertEqual((10, 45), rh.point.coords)
+        self.assertEqual(str(rh.r), '1000.50')
+        self.assertEqual(101, len(rh.curve))
+        self.assertIsNotNone(rh.envelope)
+
+    def test_batches(self):
+        features = [get_layer_feature(3) for i in range(10)]
+
+        # A layer and its rhodoneas per batch
+        callback_calls = []
+        with self.assertNumQueries(2 * 10 + 2):
+            import_features(
+                features,
+                batch_size=4,
+                callback=lambda *counts: callback_calls.append(counts),
+            )
+
+        self.assertEqual(10, len(callback_calls))
+        self.assertEqual((10, 30), callback_calls[-1])
+        self.assertEqual(30, Rhodonea.objects.count())
+
+    def test_invalid(self):
+        features = [
+            get_layer_feature(1),
+            get_layer_feature(1, title=''),
+            get_layer_feature(0),
+            'qwerty',
+        ]
+        features[0]['properties']['rhodoneas'][0]['properties']['d'] = 0
+        features[2]['properties']['rhodoneas'] = [
+            get_rhodonea_feature(nodes_count=0),
+        ]
+
+        # Each batch is validated as a whole
+        with self.assertRaises(ValidationError) as cm:
+            import_features(features)
+
+        self.assertEqual(
+            ['feature 0', 'feature 1', 'feature 2', 'feature 3'],
+            sorted(cm.exception.message_dict)
+        )
+        self.assertEqual(
+            ['This value cannot be zero.'],
+            cm.exception.message_dict['feature 0']
+        )
+
+        # Nothing is imported
+        self.assertEqual(0, Layer.objects.count())
+
+    def test_export(self):
+        for layer in [LayerFactory(), LayerFactory()]:
+            for i in range(3):
+                RhodoneaFactory(layer=layer)
+
+        exported = list(
+            Rhodonea.objects.order_by('pk').values_list(
+                'layer__title', 'name', 'point', 'r', 'n', 'd', 'rotation',
+                'nodes_count', 'stroke_color', 'stroke_weight', 'created',
+            )
+        )
+        dump = ''.join(iter_export('ndjson'))
+        Layer.objects.all().delete()
+
+        import_features(iter_ndjson_features(io.StringIO(dump)))
+
+        self.assertEqual(
+            exported,
+            list(Rhodonea.objects.order_by('pk').values_list(
+                'layer__title', 'name', 'point', 'r', 'n', 'd', 'rotation',
+                'nodes_count', 'stroke_color', 'stroke_weight', 'created',
+            ))
+        )
@@ -0,0 +1,62 @@
+from django.contrib.gis.geos import Point, Polygon
+from django.db import connection
+from django.db.models import Value
+from django.test import TestCase
+
+from rhodonea_mapper.api.filters import TrigramSimilar, build_prefix_query
+from rhodonea_mapper.models import Layer, Rhodonea
+
+from tests.rhodonea_mapper.factories import RhodoneaFactory
+
+
+class IndexesTests(TestCase):
+    '''
+    The planner must be able to answer the hot queries through indexes.
+    Sequential scans are disabled as on such small tables they would always
+    be preferred.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(20):
+            RhodoneaFactory()
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        return plan
+
+    def test_layers_in_bbox(self):
+        bbox = Polygon.from_bbox((0, 0, 10, 10))
+
+        plan = self.explain(
+            Layer.objects.filter(envelope__bboverlaps=bbox)
+        )
+        self.assertIn('envelope', plan)
+
+        plan = self.explain(Layer.objects.filter(
+            envelope__bboverlaps=bbox, created__gte='2020-01-01'
+        ))
+        self.assertIn('layer_envelope_created_gist', plan)
+
+    def test_layers_ordering(self):
+        plan = self.explain(Layer.objects.order_by('-created', '-id')[:10])
+        self.assertIn('layer_created_id_idx', plan)
+
+    def test_rhodoneas_point(self):
+        plan = self.explain(Rhodonea.objects.filter(
+            point__bboverlaps=Point(10, 45).buffer(1)
+        ))
+        self.assertIn('point', plan)
+
+    def test_layers_search(self):
+        plan = self.explain(Layer.objects.filter(
+            search_vector=build_prefix_query(['rose'])
+        ))
+        self.assertIn('layer_search_vector_gin', plan)
+
+        plan = self.explain(Layer.objects.filter(
+            TrigramSimilar('title', Value('rose'))
+        ))
+        self.assertIn('layer_title_trgm_gin', plan)
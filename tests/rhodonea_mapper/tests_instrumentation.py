@@ -0,0 +1,174 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.reverse import reverse
+
+from rhodonea_mapper import instrumentation
+from rhodonea_mapper.instrumentation import (
+    RequestStats,
+    instrumented,
+    metrics,
+)
+
+from tests.rhodonea_mapper.factories import RhodoneaFactory
+
+
+@instrumented('section')
+def instrumented_function(value):
+    return value
+
+
+class InstrumentedTests(TestCase):
+    def test_not_recording(self):
+        self.assertEqual(1, instrumented_function(1))
+
+    def test(self):
+        stats = RequestStats()
+        token = instrumentation._current.set(stats)
+        try:
+            self.assertEqual(1, instrumented_function(1))
+            self.assertEqual(2, instrumented_function(2))
+        finally:
+            instrumentation._current.reset(token)
+
+        calls, seconds = stats.sections['section']
+        self.assertEqual(2, calls)
+        self.assertGreater(seconds, 0)
+
+        instrumented_function(3)
+        self.assertEqual(2, stats.sections['section'][0])
+
+
+@override_settings(MIDDLEWARE=settings.MIDDLEWARE + [
+    'rhodonea_mapper.instrumentation.InstrumentationMiddleware',
+])
+class InstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+
+        self.layer = RhodoneaFactory().layer
+        self.url = reverse('layer-detail', args=[self.layer.id])
+
+    def get_record(self, *args, **kwargs):
+        with self.assertLogs(
+            'rhodonea_mapper.instrumentation', 'INFO'
+        ) as logs:
+            response = self.client.get(*args, **kwargs)
+        self.assertEqual(1, len(logs.records))
+        return response, json.loads(logs.records[0].getMessage())
+
+    def test(self):
+        response, record = self.get_record(self.url)
+        self.assertEqual(200, response.status_code)
+
+        self.assertEqual('layer-detail', record['view'])
+        self.assertEqual('GET', record['method'])
+        self.assertEqual(self.url, record['path'])
+        self.assertEqual(200, record['status'])
+        self.assertGreater(record['seconds'], 0)
+        # layer, overlays counter and rhodoneas
+        self.assertEqual(3, record['db_queries'])
+        self.assertGreater(record['db_seconds'], 0)
+        self.assertEqual(1, record['sections']['serialization']['calls'])
+        self.assertNotIn('profile', record)
+
+    def test_sections(self):
+        data = {
+            'title': 'Layer',
+            'rhodoneas': [{
+                'name': 'Rh 1',
+                'point': 'SRID=4326;POINT (11 46)',
+                'r': 10.5,
+                'n': 3,
+                'd': 5,
+                'rotation': -45,
+                'nodes_count': 75,
+            }],
+        }
+        with self.assertLogs(
+            'rhodonea_mapper.instrumentation', 'INFO'
+        ) as logs:
+            response = self.client.post(
+                reverse('layer-list'),
+                data=json.dumps(data),
+                content_type='application/json',
+            )
+        self.assertEqual(201, response.status_code)
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(
+            {'build_curves', 'build_envelopes', 'serialization'},
+            set(record['sections'])
+        )
+
+    def test_metrics(self):
+        self.get_record(self.url)
+        self.get_record(self.url)
+
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response, record = self.get_record(reverse('metrics'))
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response['content-type'].startswith('text/plain'))
+
+        content = response.content.decode()
+        self.assertIn(
+            'rhodonea_mapper_requests_total'
+            '{view="layer-detail",method="GET",status="200"} 2',
+            content
+        )
+        self.assertIn(
+            'rhodonea_mapper_db_queries_total{view="layer-detail"} 5',
+            content
+        )
+        self.assertIn(
+            'rhodonea_mapper_section_calls_total'
+            '{view="layer-detail",section="serialization"} 1',
+            content
+        )
+        self.assertIn('rhodonea_mapper_shapes_cache_hits_total ', content)
+
+    def test_metrics_forbidden(self):
+        response, record = self.get_record(reverse('metrics'))
+        self.assertEqual(403, response.status_code)
+
+    def test_profile_header(self):
+        with self.settings(RHODONEA_MAPPER_PROFILE_DIR=self.profile_dir):
+            # Only staff users can ask for profiling
+            response, record = self.get_record(
+                self.url, HTTP_X_RHODONEA_MAPPER_PROFILE='1'
+            )
+            self.assertNotIn('profile', record)
+
+            self.client.force_login(User.objects.create_superuser(
+                'admin', 'admin@example.com', 'password'
+            ))
+            response, record = self.get_record(
+                self.url, HTTP_X_RHODONEA_MAPPER_PROFILE='1'
+            )
+
+        self.assertEqual(
+            record['profile'], response['X-Rhodonea-Mapper-Profile']
+        )
+        self.assertEqual([record['profile']], os.listdir(self.profile_dir))
+
+    def test_profile_sample_rate(self):
+        with self.settings(
+            RHODONEA_MAPPER_PROFILE_DIR=self.profile_dir,
+            RHODONEA_MAPPER_PROFILE_SAMPLE_RATE=1,
+        ):
+            response, record = self.get_record(self.url)
+
+        self.assertIn('profile', record)
+        self.assertEqual(1, len(os.listdir(self.profile_dir)))
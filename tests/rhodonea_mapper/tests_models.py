@@ -1,7 +1,7 @@
 from unittest.mock import patch, call
 
-from django.contrib.gis.geos import MultiPolygon, Polygon
-from django.test import TestCase
+from django.contrib.gis.geos import LineString, MultiPolygon, Point, Polygon
+from django.test import TestCase, override_settings
 from pyproj import Geod
 
 from rhodonea_mapper.models import Rhodonea, Layer
@@ -12,6 +12,10 @@ from tests.rhodonea_mapper.factories import (
 )
 
 
+def build_envelope(rhodoneas):
+    return MultiPolygon(*[rh.build_envelope() for rh in rhodoneas]).envelope
+
+
 class LayerTests(TestCase):
     def test_add_overlay(self):
         count = 10
@@ -21,6 +25,84 @@ class LayerTests(TestCase):
         layer.refresh_from_db()
         self.assertEqual(count + 1, layer.overlays_count)
 
+    def test_add_overlay_keeps_modified(self):
+        layer = LayerFactory()
+        modified = layer.modified
+        layer.add_overlay()
+
+        layer.refresh_from_db()
+        self.assertEqual(modified, layer.modified)
+
+    def test_save_keeps_overlays_count(self):
+        layer = LayerFactory(overlays_count=10)
+        layer.add_overlay()
+        Layer.objects.add_overlays({layer.pk: 2})
+
+        layer.title = 'New title'
+        layer.save()
+        RhodoneaFactory(layer=layer)
+
+        layer.refresh_from_db()
+        self.assertEqual('New title', layer.title)
+        self.assertEqual(13, layer.overlays_count)
+
+    def get_search_vector(self, layer):
+        return Layer.objects.values_list(
+            'search_vector', flat=True
+        ).get(pk=layer.pk)
+
+    def test_search_vector(self):
+        layer = LayerFactory(title='Roses', notes='Drawn')
+        self.assertEqual(
+            "'drawn':2B 'roses':1A", self.get_search_vector(layer)
+        )
+
+        rh = RhodoneaFactory(layer=layer, name='Rose')
+        self.assertEqual(
+            "'drawn':2B 'rose':3C 'roses':1A", self.get_search_vector(layer)
+        )
+
+        rh.name = 'Tulip'
+        rh.save()
+        Rhodonea.objects.bulk_create([
+            Rhodonea(layer=layer, name='Daisy', point=Point(10, 45), r=1000,
+                     n=3, d=5, rotation=0, nodes_count=10),
+        ])
+        layer.title = 'Flowers'
+        layer.save()
+        self.assertEqual(
+            "'daisy':4C 'drawn':2B 'flowers':1A 'tulip':3C",
+            self.get_search_vector(layer)
+        )
+
+        layer.rhodoneas.all().delete()
+        self.assertEqual(
+            "'drawn':2B 'flowers':1A", self.get_search_vector(layer)
+        )
+
+    def test_search_vector_not_saved(self):
+        layer = Layer.objects.get(pk=LayerFactory(title='Roses').pk)
+        rh = RhodoneaFactory(layer=layer, name='Rose')
+
+        # Neither loaded nor written back
+        self.assertIn('search_vector', layer.get_deferred_fields())
+        rh = Rhodonea.objects.get(pk=rh.pk)
+        self.assertIn('search_vector', rh.layer.get_deferred_fields())
+
+        layer.save()
+        self.assertEqual(
+            "'rose':2C 'roses':1A", self.get_search_vector(layer)
+        )
+
+    def test_touch(self):
+        layer = LayerFactory()
+        modified = layer.modified
+        layer.touch()
+
+        self.assertLess(modified, layer.modified)
+        layer.refresh_from_db()
+        self.assertLess(modified, layer.modified)
+
     @patch.object(Rhodonea, 'build_envelope', autospec=True)
     def test_set_envelope(self, build_envelope):
         def build_envelope_mock(self):
@@ -46,18 +128,226 @@ class LayerTests(TestCase):
         )
         self.assertEqual(m_p.envelope.wkt, layer.envelope.wkt)
 
+    def test_set_envelope_missing(self):
+        layer = LayerFactory()
+        rh1 = RhodoneaFactory(layer=layer, point=Point(10, 45))
+        rh2 = RhodoneaFactory(layer=layer, point=Point(12, 46))
+        # Stored before the envelopes of the rhodoneas were
+        Rhodonea.objects.filter(pk=rh2.pk).update(envelope=None)
+
+        layer.set_envelope()
+        layer.refresh_from_db()
+        self.assertEqual(build_envelope([rh1, rh2]).wkt, layer.envelope.wkt)
+
+        rh2.refresh_from_db()
+        self.assertEqual(rh2.build_envelope().wkt, rh2.envelope.wkt)
+
+
+class LayerUpdateEnvelopeTests(TestCase):
+    def setUp(self):
+        self.layer = LayerFactory()
+        self.rh1 = RhodoneaFactory(layer=self.layer, point=Point(10, 45))
+        self.rh2 = RhodoneaFactory(layer=self.layer, point=Point(12, 46))
+        self.rh3 = RhodoneaFactory(
+            layer=self.layer, point=Point(11, 45.5), r=10
+        )
+
+    def assertEnvelope(self, *rhodoneas):
+        self.layer.refresh_from_db()
+        self.assertEqual(
+            build_envelope(rhodoneas).wkt,
+            self.layer.envelope.wkt
+        )
+
+    def test_insert(self):
+        self.assertEnvelope(self.rh1, self.rh2, self.rh3)
+
+    @patch.object(Layer, 'set_envelope')
+    def test_insert_inside(self, set_envelope):
+        RhodoneaFactory(layer=self.layer, point=Point(11, 45.4), r=10)
+        self.assertFalse(set_envelope.called)
+
+    def test_update_boundary(self):
+        self.rh2.point = Point(11.5, 45.5)
+        self.rh2.save()
+
+        self.assertEnvelope(self.rh1, self.rh2, self.rh3)
+
+    def test_delete_boundary(self):
+        self.rh1.delete()
+        self.assertEnvelope(self.rh2, self.rh3)
 
-class RhodoneaTests(TestCase):
     @patch.object(Layer, 'set_envelope')
+    def test_delete_inside(self, set_envelope):
+        self.rh3.delete()
+        self.assertFalse(set_envelope.called)
+
+    def test_delete_all(self):
+        self.rh1.delete()
+        self.rh2.delete()
+        self.rh3.delete()
+
+        self.layer.refresh_from_db()
+        self.assertIsNone(self.layer.envelope)
+
+
+class LayerManagerTests(TestCase):
+    @patch.object(Layer, 'set_envelope')
+    def test_create_with_rhodoneas(self, set_envelope):
+        rhodoneas_data = [
+            {
+                'name': 'Rh 1',
+                'point': Point(11, 46),
+                'r': 1000,
+                'n': 3,
+                'd': 5,
+                'rotation': -45,
+                'nodes_count': 75,
+            },
+            {
+                'name': 'Rh 2',
+                'point': Point(10, 45),
+                'r': 2500,
+                'n': 4,
+                'd': 3,
+                'rotation': 90,
+                'nodes_count': 100,
+            },
+        ]
+
+        with patch.object(
+            Layer, 'save', autospec=True, side_effect=Layer.save
+        ) as save:
+            layer = Layer.objects.create_with_rhodoneas(
+                rhodoneas_data, title='Layer'
+            )
+
+        self.assertEqual(1, save.call_count)
+        self.assertFalse(set_envelope.called)
+
+        layer.refresh_from_db()
+        rhodoneas = layer.rhodoneas.order_by('name')
+        self.assertEqual(['Rh 1', 'Rh 2'], [rh.name for rh in rhodoneas])
+
+        for rh in rhodoneas:
+            self.assertIsNotNone(rh.created)
+            self.assertEqual(rh.build_curve().wkt, rh.curve.wkt)
+
+        self.assertEqual(
+            build_envelope(rhodoneas).wkt,
+            layer.envelope.wkt
+        )
+
+
+class LayerManagerEnvelopesTests(TestCase):
+    def setUp(self):
+        self.layer = LayerFactory()
+        self.rh1 = RhodoneaFactory(layer=self.layer, point=Point(10, 45))
+        self.rh2 = RhodoneaFactory(layer=self.layer, point=Point(-70, -30))
+        self.empty = LayerFactory()
+
+    def assertExtentAlmostEqual(self, expected, envelope):
+        for a, b in zip(expected.extent, envelope.extent):
+            self.assertAlmostEqual(a, b, places=6)
+
+    def test_compute_envelopes_in_database(self):
+        Rhodonea.objects.update(envelope=None)
+        Layer.objects.update(envelope=get_centered_envelope())
+
+        with self.assertNumQueries(1):
+            count = Layer.objects.compute_envelopes_in_database(
+                [self.layer.pk, self.empty.pk]
+            )
+
+        self.assertEqual(2, count)
+        for rh in [self.rh1, self.rh2]:
+            rh.refresh_from_db()
+            self.assertExtentAlmostEqual(rh.build_envelope(), rh.envelope)
+
+        self.layer.refresh_from_db()
+        self.assertExtentAlmostEqual(
+            build_envelope([self.rh1, self.rh2]), self.layer.envelope
+        )
+        self.empty.refresh_from_db()
+        self.assertIsNone(self.empty.envelope)
+
+    def test_compute_envelopes_in_database_unchanged(self):
+        Layer.objects.compute_envelopes_in_database([self.layer.pk])
+        self.layer.refresh_from_db()
+        modified = self.layer.modified
+
+        Layer.objects.compute_envelopes_in_database([self.layer.pk])
+        self.layer.refresh_from_db()
+        self.assertEqual(modified, self.layer.modified)
+
+    def test_compute_envelopes(self):
+        Rhodonea.objects.filter(pk=self.rh1.pk).update(envelope=None)
+        Layer.objects.update(envelope=get_centered_envelope())
+
+        with patch.object(Rhodonea, 'build_envelope') as build_envelope, \
+                self.assertNumQueries(6):
+            count = Layer.objects.compute_envelopes(
+                [self.layer.pk, self.empty.pk]
+            )
+
+        self.assertFalse(build_envelope.called)
+        self.assertEqual(2, count)
+        for rh in [self.rh1, self.rh2]:
+            rh.refresh_from_db()
+            self.assertExtentAlmostEqual(rh.build_envelope(), rh.envelope)
+
+        self.layer.refresh_from_db()
+        self.assertExtentAlmostEqual(
+            build_envelope([self.rh1, self.rh2]), self.layer.envelope
+        )
+        self.empty.refresh_from_db()
+        self.assertIsNone(self.empty.envelope)
+
+    def test_compute_envelopes_unchanged(self):
+        Layer.objects.compute_envelopes([self.layer.pk])
+        self.layer.refresh_from_db()
+        modified = self.layer.modified
+
+        # Reading rhodoneas and layers, nothing to write
+        with self.assertNumQueries(2):
+            count = Layer.objects.compute_envelopes([self.layer.pk])
+
+        self.assertEqual(0, count)
+        self.layer.refresh_from_db()
+        self.assertEqual(modified, self.layer.modified)
+
+    @override_settings(RHODONEA_MAPPER_ENVELOPES_BACKEND='database')
+    def test_set_envelope(self):
+        with patch.object(Rhodonea, 'build_envelope') as build_envelope:
+            self.layer.set_envelope()
+            self.rh1.r += 100
+            self.rh1.save()
+
+        self.assertFalse(build_envelope.called)
+        self.assertExtentAlmostEqual(
+            self.rh1.build_envelope(), self.rh1.envelope
+        )
+        self.assertExtentAlmostEqual(
+            build_envelope([self.rh1, self.rh2]), self.layer.envelope
+        )
+
+
+class RhodoneaTests(TestCase):
+    @patch.object(Layer, 'update_envelope')
+    @patch.object(Rhodonea, 'build_curve')
     @patch.object(Geod, 'fwd')
     @patch.object(Polygon, 'from_bbox')
-    def test_build_envelope(self, from_bbox, fwd, set_envelope):
+    def test_build_envelope(
+        self, from_bbox, fwd, build_curve, update_envelope
+    ):
         fwd.return_value = (10, 20)
+        build_curve.return_value = LineString((0, 0), (1, 1))
 
         geom = get_centered_envelope()
         from_bbox.return_value = geom
 
         rh = RhodoneaFactory()
+        fwd.reset_mock()
         envelope = rh.build_envelope()
 
         self.assertEqual([
@@ -74,3 +364,34 @@ class RhodoneaTests(TestCase):
             fwd()[1],
         ))
         self.assertEqual(geom.envelope.wkt, envelope.wkt)
+
+    def test_curve_on_create(self):
+        rh = RhodoneaFactory()
+        rh.refresh_from_db()
+
+        self.assertIsNotNone(rh.curve)
+        self.assertEqual(rh.build_curve().wkt, rh.curve.wkt)
+        self.assertEqual(rh.build_envelope().wkt, rh.envelope.wkt)
+
+    def test_curve_unchanged(self):
+        rh = RhodoneaFactory()
+        rh = Rhodonea.objects.get(pk=rh.pk)
+
+        with patch.object(Rhodonea, 'build_curve') as build_curve:
+            rh.name = 'New name'
+            rh.stroke_weight += 1
+            rh.save()
+
+        self.assertFalse(build_curve.called)
+
+    def test_curve_changed(self):
+        rh = RhodoneaFactory()
+        rh = Rhodonea.objects.get(pk=rh.pk)
+        curve = rh.curve
+
+        rh.n += 1
+        rh.save()
+        rh.refresh_from_db()
+
+        self.assertNotEqual(curve.wkt, rh.curve.wkt)
+        self.assertEqual(rh.build_curve().wkt, rh.curve.wkt)
@@ -1,13 +1,123 @@
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.test import TestCase, override_settings
 
-from rhodonea_mapper.models import Layer
-from tests.rhodonea_mapper.factories import RhodoneaFactory
+from rhodonea_mapper.models import Layer, Rhodonea
+from rhodonea_mapper.signals import defer_envelope_updates
+from tests.rhodonea_mapper.factories import LayerFactory, RhodoneaFactory
 
 
 class SetLayerBboxAfterRhodoneaSaveTests(TestCase):
+    @patch.object(Layer, 'update_envelope')
+    def test(self, update_envelope):
+        rh = RhodoneaFactory()
+        update_envelope.assert_called_once_with(None, rh.envelope)
+
+    def test_unchanged(self):
+        rh = RhodoneaFactory()
+
+        with patch.object(Layer, 'update_envelope') as update_envelope, \
+                patch.object(Layer, 'touch') as touch:
+            rh.name = 'New name'
+            rh.save()
+
+        self.assertFalse(update_envelope.called)
+        self.assertTrue(touch.called)
+
+    def test_changed(self):
+        rh = RhodoneaFactory()
+        envelope = rh.envelope
+
+        with patch.object(Layer, 'update_envelope') as update_envelope:
+            rh.r += 100
+            rh.save()
+
+        update_envelope.assert_called_once_with(envelope, rh.envelope)
+
+    def test_moved(self):
+        l1 = LayerFactory()
+        l2 = LayerFactory()
+        rh1 = RhodoneaFactory(layer=l1, point=Point(10, 45))
+        rh2 = RhodoneaFactory(layer=l1, point=Point(12, 46))
+        rh3 = RhodoneaFactory(layer=l2, point=Point(-60, -30))
+        l1.refresh_from_db()
+        modified = l1.modified
+
+        rh2 = Rhodonea.objects.get(pk=rh2.pk)
+        rh2.layer = l2
+        rh2.save()
+
+        l1.refresh_from_db()
+        l2.refresh_from_db()
+        self.assertEqual(rh1.envelope.wkt, l1.envelope.wkt)
+        self.assertEqual(
+            MultiPolygon(rh2.envelope, rh3.envelope).envelope.wkt,
+            l2.envelope.wkt
+        )
+        # The cached details of the previous layer are stale
+        self.assertLess(modified, l1.modified)
+
+    @override_settings(RHODONEA_MAPPER_ENVELOPES_BACKEND='database')
+    def test_database(self):
+        layer = LayerFactory()
+        rh1 = RhodoneaFactory(layer=layer, point=Point(10, 45))
+        rh2 = RhodoneaFactory(layer=layer, point=Point(12, 46))
+        sentinel = Polygon.from_bbox((-1, -1, 1, 1))
+        Rhodonea.objects.filter(pk=rh1.pk).update(envelope=sentinel)
+
+        rh2.r += 100
+        rh2.save()
+
+        # Only the envelope of the rhodonea saved is computed
+        rh1.refresh_from_db()
+        self.assertEqual(sentinel.wkt, rh1.envelope.wkt)
+        layer.refresh_from_db()
+        self.assertEqual(
+            MultiPolygon(sentinel, rh2.envelope).envelope.wkt,
+            layer.envelope.wkt
+        )
+
     @patch.object(Layer, 'set_envelope')
-    def test(self, set_envelope):
-        RhodoneaFactory()
-        self.assertTrue(set_envelope.called)
+    def test_moved_deferred(self, set_envelope):
+        rh = RhodoneaFactory()
+        layer = LayerFactory()
+
+        with defer_envelope_updates():
+            rh.layer = layer
+            rh.save()
+
+        self.assertEqual(2, set_envelope.call_count)
+
+    @patch.object(Layer, 'set_envelope')
+    def test_deferred(self, set_envelope):
+        l1 = LayerFactory()
+        l2 = LayerFactory()
+
+        with defer_envelope_updates():
+            RhodoneaFactory(layer=l1)
+            RhodoneaFactory(layer=l1)
+            with defer_envelope_updates():
+                RhodoneaFactory(layer=l2)
+            self.assertFalse(set_envelope.called)
+
+        self.assertEqual(2, set_envelope.call_count)
+
+
+class SetLayerBboxAfterRhodoneaDeleteTests(TestCase):
+    def test(self):
+        rh = RhodoneaFactory()
+
+        with patch.object(Layer, 'update_envelope') as update_envelope:
+            rh.delete()
+
+        update_envelope.assert_called_once_with(old=rh.envelope)
+
+    def test_layer_deleted(self):
+        rh = RhodoneaFactory()
+        RhodoneaFactory(layer=rh.layer)
+
+        with patch.object(Layer, 'update_envelope') as update_envelope:
+            rh.layer.delete()
+
+        self.assertFalse(update_envelope.called)